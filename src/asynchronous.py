@@ -0,0 +1,409 @@
+#!/usr/bin/python3
+"""
+This file runs an asynchronous, event-driven simulation of the three distance
+vector variants. Instead of synchronous rounds in which every router reads a
+global snapshot, each router reacts to the distance vector messages that
+actually reach it. Messages travel over links with a propagation delay,
+optionally set per link, plus random jitter. A priority queue orders the
+messages and the topology events by simulated time in milliseconds.
+
+Receiving a message goes through RoutingTable.setCost and updateCoordinates, as
+in the rounds. A router then sends its neighbors the destinations whose
+advertised ( cost, hop count, next hop ) entry changed. A router touched by a
+topology event sends its whole distance vector instead. Changes from messages
+arriving at the same time are sent together once all of them are processed.
+Each link delivers its messages in the order they were sent, and messages
+still in flight over a link when it is removed are dropped.
+
+Events of round N happen at N times the round length. Each variant's final
+table, convergence time and message count are written to
+output-async-<variant>.txt.
+"""
+import argparse, heapq, math, random, sys
+from concurrent.futures import ProcessPoolExecutor
+
+from oracle import apply_events, verify_table
+from router import RoutingTable, SparseRoutingTable
+from simulator import VARIANTS, SPLIT_HORIZON, SPLIT_HORIZON_POISON_REVERSE, VARIANT_NAMES, COUNT_TO_INFINITY_HOPS, \
+                      HOP_LIMIT, ROUND_BUDGET, Instability, setup_network, update_network, tableize, \
+                      pretty_print, file_to_undirected_graph, file_to_topological_events
+
+"""
+Reads per-link propagation delays from a file with one link per line as
+
+    <router1> <router2> <delay in ms>
+
+skipping blank lines and lines starting with #. Returns them keyed by
+( lower label, higher label ).
+"""
+def read_link_delays( filename ):
+    delays = {}
+
+    with open( filename, 'r' ) as handle:
+        for line_num, line in enumerate( handle, 1 ):
+            fields = line.split()
+
+            if not fields or fields[0].startswith( '#' ):
+                continue
+
+            if len( fields ) != 3:
+                raise ValueError( '{}:{}: expected <router1> <router2> <delay>'.format( filename, line_num ) )
+
+            r1, r2 = int( fields[0] ), int( fields[1] )
+            delay  = float( fields[2] )
+
+            if delay <= 0:
+                raise ValueError( '{}:{}: delays must be positive'.format( filename, line_num ) )
+
+            delays[( min( r1, r2 ), max( r1, r2 ) )] = delay
+
+    return delays
+
+"""
+Holds the outcome of an asynchronous simulation: the final table, the time in
+ms from the last topology event to the last change of any advertised route,
+and the number of messages delivered and dropped. A simulation stopped as
+unstable has its instability, and no convergence time.
+"""
+class AsyncResult:
+    def __init__( self, algoType, table, convergenceTime, messages, dropped, instability=None ):
+        self.algoType        = algoType
+        self.table           = table
+        self.convergenceTime = convergenceTime
+        self.messages        = messages
+        self.dropped         = dropped
+        self.instability     = instability
+
+"""
+An asynchronous simulation of one algorithm variant on a network. Routers only
+do work when a message reaches them. The simulation stops as unstable once a
+router advertises a hop count of maxHops, or once simulated time passes
+maxTime ms.
+"""
+class AsyncSimulation:
+    def __init__( self, network, events, algoType, delay=1.0, jitter=0.0, linkDelays=None, roundLength=1.0, seed=None, maxHops=COUNT_TO_INFINITY_HOPS, maxTime=None ):
+        self.network       = network
+        self.events        = events
+        self.algoType      = algoType
+        self.delay         = delay
+        self.jitter        = jitter
+        self.linkDelays    = linkDelays if linkDelays is not None else {}
+        self.roundLength   = roundLength
+        self.random        = random.Random( seed )
+        self.maxHops       = maxHops
+        self.maxTime       = maxTime
+        self.numRouters    = len( network.vertices )
+        self.queue         = []
+        self.count         = 0
+        self.now           = 0.0
+        self.lastChange    = 0.0
+        self.lastEventTime = 0.0
+        self.messages      = 0
+        self.dropped       = 0
+        self.instability   = None
+
+        #messages carry the epoch of their link, which moves on when the link
+        #is removed, and each directed link remembers its last arrival time
+        self.epochs   = {}
+        self.arrivals = {}
+
+        #the entry each router last advertised, per destination, and the rows
+        #each router has yet to send, or None to send every row
+        self.advertised = { vertex: [ None for i in range( self.numRouters ) ] for vertex in network.vertices }
+        self.unsent     = {}
+
+        setup_network( network, False )
+
+        for vertex in network.vertices:
+            network.vertices[vertex].updateCoordinates()
+
+        for vertex in network.vertices:
+            self.advertise( vertex, full=True )
+
+    #queues a message from a router to one neighbor with the advertised
+    #entries of the given rows, leaving out or poisoning the routes through
+    #the neighbor under split horizon and poison reverse
+    def send( self, vertex, neighbor, rows ):
+        advertised = self.advertised[vertex]
+        entries    = []
+
+        for c in rows:
+            entry = advertised[c]
+
+            #skip ourselves, and entries with nothing to advertise
+            if c + 1 == vertex or entry is None:
+                continue
+
+            cost, hops, next_hop = entry
+            poisoned             = False
+
+            if next_hop == neighbor:
+                if self.algoType == SPLIT_HORIZON_POISON_REVERSE:
+                    poisoned = True
+                elif self.algoType == SPLIT_HORIZON:
+                    continue
+
+            entries.append( ( c, cost, hops, poisoned ) )
+
+        if not entries:
+            return
+
+        link  = ( min( vertex, neighbor ), max( vertex, neighbor ) )
+        delay = self.linkDelays.get( link, self.delay )
+
+        if self.jitter:
+            delay += self.random.uniform( 0, self.jitter )
+
+        #links deliver in order, so a message never overtakes an earlier one
+        arrival = max( self.now + delay, self.arrivals.get( ( vertex, neighbor ), 0.0 ) )
+        self.arrivals[( vertex, neighbor )] = arrival
+
+        self.schedule( arrival, self.receive, vertex, neighbor, self.epochs.get( link, 0 ), entries )
+
+    #queues an action to happen at the given time, after those already queued
+    #for that time
+    def schedule( self, time, action, *args ):
+        heapq.heappush( self.queue, ( time, self.count, action, args ) )
+        self.count += 1
+
+    #sends a router's unsent rows to its neighbors
+    def flush( self, vertex ):
+        rows = self.unsent.pop( vertex )
+
+        for neighbor in self.network.getNeighbors( vertex ):
+            if neighbor != vertex:
+                self.send( vertex, neighbor, range( self.numRouters ) if rows is None else sorted( rows ) )
+
+    #brings a router's advertised entries for the given rows, or all of them,
+    #up to date and has the changed ones sent to its neighbors, or its whole
+    #distance vector if full
+    def advertise( self, vertex, rows=None, full=False ):
+        router     = self.network.vertices[vertex]
+        advertised = self.advertised[vertex]
+        changed    = []
+
+        for c in ( range( self.numRouters ) if rows is None else rows ):
+            via = int( router.via[c] )
+
+            if via == 0:
+                entry = None
+            else:
+                entry = ( router.getCost( c + 1, via ), router.getNumHops( c + 1, via ), router.hops[c] )
+
+            if entry == advertised[c]:
+                continue
+
+            advertised[c] = entry
+            changed.append( c )
+
+            if entry is not None and self.maxHops is not None and entry[1] >= self.maxHops and self.instability is None:
+                self.instability = Instability(
+                    HOP_LIMIT, int( self.now // self.roundLength ),
+                    'Encountered a count-to-infinity instability: router {} reached a hop count of {} to router {} at {:g} ms.'.format( vertex, entry[1], c + 1, self.now ),
+                    vertex, c + 1
+                )
+
+        router.changedRows.clear()
+
+        if changed:
+            self.lastChange = self.now
+
+        if not full and not changed:
+            return
+
+        if vertex not in self.unsent:
+            self.unsent[vertex] = set()
+            self.schedule( self.now, self.flush, vertex )
+
+        if full:
+            self.unsent[vertex] = None
+        elif self.unsent[vertex] is not None:
+            self.unsent[vertex].update( changed )
+
+    #delivers a message to its receiver, which updates its table with it and
+    #passes on whatever that changed
+    def receive( self, sender, receiver, epoch, entries ):
+        link = ( min( sender, receiver ), max( sender, receiver ) )
+
+        if epoch != self.epochs.get( link, 0 ):
+            self.dropped += 1
+            return
+
+        self.messages += 1
+        router         = self.network.vertices[receiver]
+        additional     = router.getCost( sender, sender )
+        rows           = []
+
+        for c, cost, hops, poisoned in entries:
+            new_cost = math.inf if poisoned else cost + additional
+
+            if router.setCost( c + 1, sender, new_cost ):
+                router.setNumHops( c + 1, sender, 1 + hops )
+                rows.append( c )
+
+        if rows:
+            router.updateCoordinates( sorted( rows ) )
+            self.advertise( receiver, rows )
+
+    #applies the events of a round, and has every router they touched send
+    #its whole distance vector
+    def applyEvents( self, roundNum ):
+        events  = self.events.getEvents( roundNum )
+        updates = { vertex: False for vertex in self.network.vertices }
+
+        update_network( self.network, events, updates )
+
+        for e in events:
+            if e.cost < 0:
+                link              = ( min( e.router1, e.router2 ), max( e.router1, e.router2 ) )
+                self.epochs[link] = self.epochs.get( link, 0 ) + 1
+
+        self.lastEventTime = self.now
+
+        for vertex, flagged in updates.items():
+            if flagged:
+                self.network.vertices[vertex].updateCoordinates()
+                self.advertise( vertex, full=True )
+
+    #processes messages and events in time order until no messages are in
+    #flight and no events are left, and returns the result
+    def run( self ):
+        while self.instability is None:
+            next_round = self.events.nextRound()
+            event_time = next_round * self.roundLength if next_round is not None else None
+
+            #events happen before messages arriving at the same time
+            if self.queue and ( event_time is None or self.queue[0][0] < event_time ):
+                time, count, action, args = heapq.heappop( self.queue )
+                self.now = time
+                action( *args )
+            elif event_time is not None:
+                self.now = max( self.now, event_time )
+                self.applyEvents( next_round )
+            else:
+                break
+
+            if self.maxTime is not None and self.now > self.maxTime and self.instability is None:
+                self.instability = Instability( ROUND_BUDGET, int( self.now // self.roundLength ), 'Did not converge within {:g} ms.'.format( self.maxTime ) )
+
+        return self.result()
+
+    #returns the result of the simulation so far
+    def result( self ):
+        return AsyncResult(
+            self.algoType,
+            tableize( self.network ),
+            max( self.lastChange - self.lastEventTime, 0.0 ) if self.instability is None else None,
+            self.messages,
+            self.dropped,
+            self.instability
+        )
+
+"""
+Writes an asynchronous simulation result as an output file: the final table,
+then the convergence time and message counts.
+"""
+def write_async_result( writer, result ):
+    pretty_print( result.table, writer )
+    writer.write( '\nConvergence Time: {:g} ms\nMessages: {} delivered, {} dropped'.format( result.convergenceTime, result.messages, result.dropped ) )
+
+"""
+Runs one algorithm variant on its own copy of the parsed inputs, as the entry
+point of each worker process, and writes its output file unless it was stopped
+as unstable. Returns the variant's instability, if any, and the outcome of
+verify_table on its final table and the final network when verifying.
+"""
+def run_async_variant( topology, events, algoType, options, verify=False ):
+    result = AsyncSimulation( topology, events, algoType, **options ).run()
+    checks = None
+
+    if result.instability is None:
+        with open( 'output-async-{}.txt'.format( VARIANT_NAMES[algoType] ), 'w' ) as outfile:
+            write_async_result( outfile, result )
+
+        #the network must be the final one, with every event applied
+        if verify:
+            apply_events( topology, events )
+            checks = verify_table( topology, result.table )
+
+    return result.instability, checks
+
+"""
+Main function, runs on command line call.
+"""
+def main( argv=None ):
+    parser = argparse.ArgumentParser( description='Run an asynchronous, event-driven distance vector simulation.' )
+    parser.add_argument( 'topology' )
+    parser.add_argument( 'events' )
+    parser.add_argument( '--variants', default=','.join( VARIANTS ) )
+    parser.add_argument( '--sparse', action='store_true', help='store routing tables sparsely' )
+    parser.add_argument( '--delay', type=float, default=1.0, help='propagation delay of every link, in ms' )
+    parser.add_argument( '--link-delays', help='file of per-link delays overriding --delay' )
+    parser.add_argument( '--jitter', type=float, default=0.0, help='random extra delay of up to this many ms per message' )
+    parser.add_argument( '--seed', type=int, help='seed for the jitter' )
+    parser.add_argument( '--round-length', type=float, default=1.0, help='ms per round of the event file' )
+    parser.add_argument( '--max-hops', type=int, default=COUNT_TO_INFINITY_HOPS, help='hop count at which a variant is stopped as unstable' )
+    parser.add_argument( '--max-time', type=float, help='ms a variant may run without converging' )
+    parser.add_argument( '--verify', action='store_true', help='check the final tables on the final network, noting entries that are not least cost paths' )
+    args = parser.parse_args( argv )
+
+    variants = args.variants.split( ',' )
+
+    if args.delay <= 0:
+        parser.error( '--delay must be positive' )
+
+    for variant in variants:
+        if variant not in VARIANTS:
+            parser.error( 'unknown variant: {}'.format( variant ) )
+
+    #malformed input files are reported by file and line
+    try:
+        options = {
+            'delay'      : args.delay,
+            'jitter'     : args.jitter,
+            'linkDelays' : read_link_delays( args.link_delays ) if args.link_delays is not None else None,
+            'roundLength': args.round_length,
+            'seed'       : args.seed,
+            'maxHops'    : args.max_hops,
+            'maxTime'    : args.max_time
+        }
+
+        topology = file_to_undirected_graph( args.topology, SparseRoutingTable if args.sparse else RoutingTable )
+        events   = file_to_topological_events( args.events, len( topology.vertices ) )
+    except ValueError as error:
+        sys.exit( str( error ) )
+
+    with ProcessPoolExecutor( max_workers=len( variants ) ) as pool:
+        futures = [ pool.submit( run_async_variant, topology, events, VARIANTS[variant], options, args.verify ) for variant in variants ]
+        outcomes = [ future.result() for future in futures ]
+
+    #entries that are not least cost paths are expected, as in simulator.py,
+    #so only instabilities and broken tables make the run fail
+    problems = []
+
+    for variant, ( instability, checks ) in zip( variants, outcomes ):
+        if instability is not None:
+            problems.append( '{}: {}'.format( variant, instability ) )
+
+        if checks is None:
+            continue
+
+        violations, differences = checks
+
+        if violations:
+            router, destination, entry, problem = violations[0]
+            problems.append( '{}: {} table entries are invalid, first router {} to router {}: {} {}'.format(
+                variant, len( violations ), router, destination, entry, problem
+            ) )
+
+        if differences:
+            router, destination, expected, actual = differences[0]
+            print( '{}: {} table entries are not least cost paths, first router {} to router {}: least cost {}, got {}'.format(
+                variant, len( differences ), router, destination, expected, actual
+            ) )
+
+    if problems:
+        sys.exit( '\n'.join( problems ) )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+#!/usr/bin/python3
+"""
+This file runs many scenarios, each a topology file and an event file, through
+the selected algorithm variants across a pool of worker processes. Every
+scenario's output files go to a directory of its own under the output
+directory, so runs never clobber each other, and a summary of every run's
+status, rounds, convergence delay and runtime is written as CSV and printed.
+
+Scenarios come from a manifest, with one scenario per line as
+
+    <topology file> <event file> [<name>]
+
+where relative paths are from the manifest's directory, and blank lines and
+lines starting with # are skipped. Alternatively, --glob matches scenario
+directories that each hold a topology and an event file.
+"""
+import argparse, csv, glob, os, sys, time
+from concurrent.futures import ProcessPoolExecutor
+
+from router import numpy
+from simulator import VARIANTS, ENGINES, TABLES, StabilityLimits, file_to_undirected_graph, \
+                      file_to_topological_events, output_filename, run_to_file
+
+FIELDS = [ 'scenario', 'variant', 'status', 'rounds', 'convergence_delay', 'parse_seconds', 'wall_seconds', 'instability' ]
+
+"""
+Reads a manifest into a list of ( name, topology file, event file ) scenarios.
+"""
+def read_manifest( filename ):
+    directory = os.path.dirname( os.path.abspath( filename ) )
+    scenarios = []
+
+    with open( filename, 'r' ) as handle:
+        for line_num, line in enumerate( handle, 1 ):
+            fields = line.split()
+
+            if not fields or fields[0].startswith( '#' ):
+                continue
+
+            if len( fields ) not in ( 2, 3 ):
+                raise ValueError( '{}:{}: expected <topology file> <event file> [<name>]'.format( filename, line_num ) )
+
+            topology = os.path.join( directory, fields[0] )
+            events   = os.path.join( directory, fields[1] )
+            name     = fields[2] if len( fields ) == 3 else os.path.splitext( os.path.basename( fields[0] ) )[0]
+            scenarios.append( ( name, topology, events ) )
+
+    return scenarios
+
+"""
+Finds the scenario directories matching a glob pattern, named after the
+directories, that hold both a topology and an event file of the given names.
+"""
+def glob_scenarios( pattern, topology_name, events_name ):
+    scenarios = []
+
+    for directory in sorted( glob.glob( pattern ) ):
+        topology = os.path.join( directory, topology_name )
+        events   = os.path.join( directory, events_name )
+
+        if os.path.isfile( topology ) and os.path.isfile( events ):
+            scenarios.append( ( os.path.basename( os.path.normpath( directory ) ), topology, events ) )
+
+    return scenarios
+
+"""
+Runs one variant of one scenario, writing its output file to the scenario's
+directory. This runs in a worker process. Returns the scenario's summary row;
+instabilities and errors are recorded in the row rather than stopping the batch.
+"""
+def run_job( name, topology_filename, event_filename, directory, variant, verbose, table, engine, compress, limits=None ):
+    row = { 'scenario': name, 'variant': variant, 'status': 'ok' }
+
+    try:
+        start    = time.perf_counter()
+        topology = file_to_undirected_graph( topology_filename, TABLES[table] )
+        events   = file_to_topological_events( event_filename, len( topology.vertices ) )
+        parsed   = time.perf_counter()
+
+        row['parse_seconds'] = round( parsed - start, 6 )
+        filename             = os.path.join( directory, output_filename( VARIANTS[variant], verbose, compress ) )
+
+        simulation, result = run_to_file( filename, topology, events, verbose, VARIANTS[variant], ENGINES[engine], limits=limits )
+
+        row['wall_seconds'] = round( time.perf_counter() - parsed, 6 )
+
+        if result.instability is not None:
+            row['status']      = result.instability.kind
+            row['rounds']      = result.instability.roundNum
+            row['instability'] = str( result.instability )
+        else:
+            row['convergence_delay'] = result.convergenceDelay
+            row['rounds']            = simulation.roundNum - 1
+    except Exception as e:
+        row['status'] = 'error: {}'.format( e )
+
+    return row
+
+"""
+Prints summary rows as an aligned table of the given fields.
+"""
+def print_summary( rows, out=sys.stdout, fields=FIELDS ):
+    table = [ fields ] + [ [ str( row.get( field, '' ) ) for field in fields ] for row in rows ]
+    lens  = [ max( map( len, col ) ) for col in zip( *table ) ]
+    fmt   = '  '.join( '{{:{}}}'.format( x ) for x in lens )
+
+    for line in table:
+        out.write( fmt.format( *line ).rstrip() + '\n' )
+
+"""
+Main function, runs on command line call.
+"""
+def main( argv=None ):
+    parser = argparse.ArgumentParser( description='Run many topology/event scenarios through the simulator.' )
+    parser.add_argument( 'manifest', nargs='?', help='manifest of scenarios, one per line' )
+    parser.add_argument( '--glob', help='pattern matching scenario directories, instead of a manifest' )
+    parser.add_argument( '--topology-name', default='topology.txt', help='topology file name in globbed directories' )
+    parser.add_argument( '--events-name', default='events.txt', help='event file name in globbed directories' )
+    parser.add_argument( '--output', default='batch-output', help='directory to write scenario directories to' )
+    parser.add_argument( '--variants', default=','.join( VARIANTS ) )
+    parser.add_argument( '--engine', default='loop', choices=ENGINES )
+    parser.add_argument( '--table', default='list', choices=TABLES )
+    parser.add_argument( '--verbose', action='store_true', help='write detailed output' )
+    parser.add_argument( '--gzip', action='store_true', help='write gzip compressed output' )
+    parser.add_argument( '--workers', type=int, default=os.cpu_count() )
+    parser.add_argument( '--max-hops', type=int, default=StabilityLimits().maxHops, help='hop count at which a variant is stopped as unstable' )
+    parser.add_argument( '--max-cost', type=int, help='finite cost at which a variant is stopped as unstable' )
+    parser.add_argument( '--max-rises', type=int, help='times a least cost may rise in a row before a variant is stopped as unstable' )
+    parser.add_argument( '--max-rounds', type=int, help='rounds a variant may run without converging' )
+    args = parser.parse_args( argv )
+
+    if ( args.manifest is None ) == ( args.glob is None ):
+        parser.error( 'give either a manifest or --glob' )
+
+    if args.engine == 'vectorized' and args.table != 'numpy':
+        parser.error( 'the vectorized engine needs --table numpy' )
+
+    if args.table == 'numpy' and numpy is None:
+        parser.error( '--table numpy needs numpy, which is not installed' )
+
+    if args.manifest is not None:
+        scenarios = read_manifest( args.manifest )
+    else:
+        scenarios = glob_scenarios( args.glob, args.topology_name, args.events_name )
+
+    names = [ name for name, topology, events in scenarios ]
+
+    if len( set( names ) ) != len( names ):
+        parser.error( 'scenario names must be unique; name them in the manifest' )
+
+    variants = args.variants.split( ',' )
+    limits   = StabilityLimits( args.max_hops, args.max_cost, args.max_rises, args.max_rounds )
+
+    for variant in variants:
+        if variant not in VARIANTS:
+            parser.error( 'unknown variant: {}'.format( variant ) )
+
+    with ProcessPoolExecutor( max_workers=args.workers ) as pool:
+        futures = []
+
+        for name, topology, events in scenarios:
+            directory = os.path.join( args.output, name )
+            os.makedirs( directory, exist_ok=True )
+
+            for variant in variants:
+                futures.append( pool.submit(
+                    run_job, name, topology, events, directory, variant,
+                    args.verbose, args.table, args.engine, args.gzip, limits
+                ) )
+
+        rows = [ future.result() for future in futures ]
+
+    os.makedirs( args.output, exist_ok=True )
+
+    with open( os.path.join( args.output, 'summary.csv' ), 'w', newline='' ) as handle:
+        writer = csv.DictWriter( handle, fieldnames=FIELDS )
+        writer.writeheader()
+        writer.writerows( rows )
+
+    print_summary( rows )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+#!/usr/bin/python3
+"""
+This file benchmarks the simulator on synthetic networks. For every topology
+kind and size it generates a topology and event file, then runs each algorithm
+variant to convergence in a fresh process and records the parse time, wall
+time, rounds, convergence delay, peak memory and per-round times as CSV. With
+--parse-lines it instead measures the throughput of parsing topology and event
+files of that many lines.
+"""
+import argparse, csv, os, random, resource, sys, tempfile, time
+from concurrent.futures import ProcessPoolExecutor
+
+import generator
+from router import RoutingTable, SparseRoutingTable, ArrayRoutingTable
+from simulator import VARIANTS, ENGINES, Simulation, \
+                      file_to_undirected_graph, file_to_topological_events, file_to_topology, file_to_event_stream
+
+FIELDS = [
+    'topology', 'routers', 'links', 'events', 'variant', 'engine', 'status',
+    'parse_seconds', 'wall_seconds', 'rounds', 'convergence_delay',
+    'peak_rss_kb', 'mean_round_ms', 'max_round_ms'
+]
+
+PARSE_FIELDS = [ 'input', 'format', 'lines', 'parse_seconds', 'lines_per_second' ]
+
+"""
+Parses one input and measures it, in a fresh worker process. A stream is read
+through to its end.
+"""
+def measure_parse( kind, filename, lines ):
+    start = time.perf_counter()
+
+    if kind == 'topology':
+        file_to_topology( filename )
+    elif kind == 'events':
+        file_to_topological_events( filename )
+    else:
+        for event in file_to_event_stream( filename ):
+            pass
+
+    seconds = time.perf_counter() - start
+
+    return {
+        'input'           : kind,
+        'lines'           : lines,
+        'parse_seconds'   : round( seconds, 6 ),
+        'lines_per_second': round( lines / seconds )
+    }
+
+"""
+Writes a ring topology of the given number of links and as many events, sorted
+by round, in the text and binary formats, and measures parsing each of them.
+"""
+def parse_benchmark( writer, outfile, lines, seed ):
+    rng                = random.Random( seed )
+    num_routers, edges = generator.ring_topology( lines, rng )
+    links              = list( edges )
+    events             = [ ( 2 + i // 1000, *links[rng.randrange( len( links ) )], rng.randint( -1, 40 ) ) for i in range( lines ) ]
+
+    with tempfile.TemporaryDirectory() as directory:
+        files = {}
+
+        for form, write_topology, write_events in (
+            ( 'text', generator.write_topology, generator.write_events ),
+            ( 'binary', generator.write_binary_topology, generator.write_binary_events )
+        ):
+            files[( 'topology', form )] = os.path.join( directory, 'topology.' + form )
+            files[( 'events', form )]   = os.path.join( directory, 'events.' + form )
+            write_topology( files[( 'topology', form )], num_routers, edges )
+            write_events( files[( 'events', form )], events )
+
+        for kind in ( 'topology', 'events', 'stream' ):
+            for form in ( 'text', 'binary' ):
+                with ProcessPoolExecutor( max_workers=1 ) as pool:
+                    row = pool.submit( measure_parse, kind, files[( 'topology' if kind == 'topology' else 'events', form )], lines ).result()
+
+                row.update( format=form )
+                writer.writerow( row )
+                outfile.flush()
+
+"""
+Runs one variant on a generated network and measures it. This runs in its own
+worker process so the peak memory is that of this run alone.
+"""
+def measure( topology_filename, event_filename, variant, engine, use_numpy, use_sparse=False ):
+    table_class = ArrayRoutingTable if use_numpy or engine == 'vectorized' else RoutingTable
+
+    if use_sparse and engine != 'vectorized':
+        table_class = SparseRoutingTable
+
+    start    = time.perf_counter()
+    topology = file_to_undirected_graph( topology_filename, table_class )
+    events   = file_to_topological_events( event_filename )
+    parsed   = time.perf_counter()
+
+    simulation = Simulation( topology, events, VARIANTS[variant], False, ENGINES[engine] )
+    round_times = []
+    status      = 'ok'
+
+    while True:
+        round_start = time.perf_counter()
+        stepped     = simulation.step()
+        round_times.append( time.perf_counter() - round_start )
+
+        if not stepped:
+            break
+
+    result = simulation.result()
+    done   = time.perf_counter()
+
+    if result.instability is not None:
+        status = result.instability.kind
+
+    return {
+        'variant'          : variant,
+        'engine'           : engine,
+        'status'           : status,
+        'parse_seconds'    : round( parsed - start, 6 ),
+        'wall_seconds'     : round( done - parsed, 6 ),
+        'rounds'           : simulation.roundNum - 1,
+        'convergence_delay': result.convergenceDelay,
+        'peak_rss_kb'      : resource.getrusage( resource.RUSAGE_SELF ).ru_maxrss,
+        'mean_round_ms'    : round( 1000 * sum( round_times ) / len( round_times ), 3 ),
+        'max_round_ms'     : round( 1000 * max( round_times ), 3 )
+    }
+
+"""
+Main function, runs on command line call.
+"""
+def main( argv=None ):
+    parser = argparse.ArgumentParser( description='Benchmark the simulator on synthetic networks.' )
+    parser.add_argument( '--topologies', default='ring,grid,geometric,barabasi-albert,fat-tree' )
+    parser.add_argument( '--sizes', default='10,50,100', help='comma separated router counts' )
+    parser.add_argument( '--variants', default=','.join( VARIANTS ) )
+    parser.add_argument( '--engines', default='loop', help='comma separated, from: ' + ', '.join( ENGINES ) )
+    parser.add_argument( '--numpy', action='store_true', help='use array-backed routing tables' )
+    parser.add_argument( '--sparse', action='store_true', help='use sparse routing tables, except with the vectorized engine' )
+    parser.add_argument( '--failures', type=int, default=1 )
+    parser.add_argument( '--cost-changes', type=int, default=1 )
+    parser.add_argument( '--flaps', type=int, default=1 )
+    parser.add_argument( '--seed', type=int, default=0 )
+    parser.add_argument( '--parse-lines', type=int, help='measure parsing inputs of this many lines instead of simulating' )
+    parser.add_argument( '--output', help='CSV file to write, standard output by default' )
+    args = parser.parse_args( argv )
+
+    outfile = open( args.output, 'w', newline='' ) if args.output else sys.stdout
+    writer  = csv.DictWriter( outfile, fieldnames=PARSE_FIELDS if args.parse_lines else FIELDS )
+    writer.writeheader()
+
+    if args.parse_lines:
+        parse_benchmark( writer, outfile, args.parse_lines, args.seed )
+    else:
+        run_benchmarks( writer, outfile, args )
+
+    if outfile is not sys.stdout:
+        outfile.close()
+
+"""
+Generates every network and measures every engine and variant on it.
+"""
+def run_benchmarks( writer, outfile, args ):
+    with tempfile.TemporaryDirectory() as directory:
+        for kind in args.topologies.split( ',' ):
+            for size in [ int( n ) for n in args.sizes.split( ',' ) ]:
+                num_routers, edges = generator.generate_topology( kind, size, args.seed )
+                events = generator.generate_events( edges, args.failures, args.cost_changes, args.flaps, seed=args.seed )
+
+                topology_filename = os.path.join( directory, '{}-{}-topology.txt'.format( kind, size ) )
+                event_filename    = os.path.join( directory, '{}-{}-events.txt'.format( kind, size ) )
+                generator.write_topology( topology_filename, num_routers, edges )
+                generator.write_events( event_filename, events )
+
+                for engine in args.engines.split( ',' ):
+                    for variant in args.variants.split( ',' ):
+                        #a fresh process per run keeps the peak memory of runs apart
+                        with ProcessPoolExecutor( max_workers=1 ) as pool:
+                            row = pool.submit( measure, topology_filename, event_filename, variant, engine, args.numpy, args.sparse ).result()
+
+                        row.update( topology=kind, routers=num_routers, links=len( edges ), events=len( events ) )
+                        writer.writerow( row )
+                        outfile.flush()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+#!/usr/bin/python3
+"""
+This file defines a compact binary format for topology and event files, and
+converts text files to it. A binary file is a header of a four byte magic,
+the number of routers ( topologies only, 0 for events ) and the number of
+records, followed by fixed-width little-endian records: router1, router2 and
+cost for a topology, and round, router1, router2 and cost for events. Loading
+memory-maps the file and builds the Topology or EventQueue straight from the
+records, with no per-line string handling.
+"""
+import argparse, mmap, struct, sys
+from contextlib import contextmanager
+
+from event import Event, EventQueue
+from parsing import Topology, check_record, check_event, check_linked, links_valid, events_valid, collection_paused, \
+                    parse_topology, parse_events
+
+TOPOLOGY_MAGIC = b'DVT1'
+EVENT_MAGIC    = b'DVE1'
+
+HEADER          = struct.Struct( '<4sII' )
+TOPOLOGY_RECORD = struct.Struct( '<iii' )
+EVENT_RECORD    = struct.Struct( '<iiii' )
+
+"""
+Returns if a file is a binary file with the given magic.
+"""
+def is_binary( filename, magic ):
+    with open( filename, 'rb' ) as handle:
+        return handle.read( len( magic ) ) == magic
+
+"""
+Memory-maps a binary file and gives its number of routers and a view of its
+records, checking the magic and that the file holds exactly the records its
+header counts. The map is closed when the context exits.
+"""
+@contextmanager
+def mapped_records( filename, magic, record ):
+    with open( filename, 'rb' ) as handle, \
+         mmap.mmap( handle.fileno(), 0, access=mmap.ACCESS_READ ) as buf:
+        if len( buf ) < HEADER.size:
+            raise ValueError( '{}: truncated header'.format( filename ) )
+
+        file_magic, num_routers, num_records = HEADER.unpack_from( buf, 0 )
+
+        if file_magic != magic:
+            raise ValueError( '{}: not a binary {} file'.format( filename, 'topology' if magic == TOPOLOGY_MAGIC else 'event' ) )
+
+        if len( buf ) != HEADER.size + num_records * record.size:
+            raise ValueError( '{}: expected {} records of {} bytes after the header, found {} bytes'.format(
+                filename, num_records, record.size, len( buf ) - HEADER.size
+            ) )
+
+        with memoryview( buf ) as view:
+            with view[HEADER.size:] as records:
+                yield num_routers, records
+
+"""
+This turns a binary topology file into a Topology, the router count and links
+in record order, with the same checks as a text file.
+"""
+@collection_paused()
+def binary_to_topology( filename ):
+    with mapped_records( filename, TOPOLOGY_MAGIC, TOPOLOGY_RECORD ) as ( num_routers, records ):
+        links = list( TOPOLOGY_RECORD.iter_unpack( records ) )
+
+    if not links_valid( list( zip( *links ) ), num_routers ):
+        for record_num, ( router1, router2, cost ) in enumerate( links, 1 ):
+            check_record( '{}: record {}'.format( filename, record_num ), num_routers, router1, router2, cost, True )
+
+    return check_linked( filename, Topology( num_routers, links ) )
+
+"""
+This turns a binary event file into an event queue, checking the routers
+against the number of routers if it is given, as for a text file.
+"""
+@collection_paused()
+def binary_to_topological_events( filename, num_routers=None ):
+    event_queue = EventQueue()
+
+    with mapped_records( filename, EVENT_MAGIC, EVENT_RECORD ) as ( file_routers, records ):
+        events = list( EVENT_RECORD.iter_unpack( records ) )
+
+    if not events_valid( list( zip( *events ) ), num_routers ):
+        for record_num, event in enumerate( events, 1 ):
+            check_event( '{}: record {}'.format( filename, record_num ), num_routers, *event )
+
+    event_queue.addEvents( Event( *event ) for event in events )
+    return event_queue
+
+"""
+This lazily reads events from a binary event file already sorted by round
+number, yielding them one at a time, with the same checks as
+binary_to_topological_events.
+"""
+def binary_to_event_generator( filename, num_routers=None ):
+    last_round = None
+
+    with mapped_records( filename, EVENT_MAGIC, EVENT_RECORD ) as ( file_routers, records ):
+        for record_num, ( round_num, router1, router2, cost ) in enumerate( EVENT_RECORD.iter_unpack( records ), 1 ):
+            location = '{}: record {}'.format( filename, record_num )
+            check_event( location, num_routers, round_num, router1, router2, cost )
+
+            if last_round is not None and round_num < last_round:
+                raise ValueError( '{}: event for round {} follows round {}; events must be sorted to be streamed'.format( location, round_num, last_round ) )
+
+            last_round = round_num
+            yield Event( round_num, router1, router2, cost )
+
+"""
+Writes a header and records to a binary file.
+"""
+def write_records( filename, magic, num_routers, record, records ):
+    with open( filename, 'wb' ) as handle:
+        handle.write( HEADER.pack( magic, num_routers, len( records ) ) )
+        handle.write( b''.join( record.pack( *r ) for r in records ) )
+
+"""
+Converts a text topology file to the binary format.
+"""
+def text_to_binary_topology( text_filename, binary_filename ):
+    topology = parse_topology( text_filename )
+    write_records( binary_filename, TOPOLOGY_MAGIC, topology.numRouters, TOPOLOGY_RECORD, topology.links )
+
+"""
+Converts a text event file to the binary format.
+"""
+def text_to_binary_events( text_filename, binary_filename ):
+    records = [ ( e.roundNum, e.router1, e.router2, e.cost ) for e in parse_events( text_filename ) ]
+    write_records( binary_filename, EVENT_MAGIC, 0, EVENT_RECORD, records )
+
+"""
+Main function, runs on command line call.
+"""
+def main( argv=None ):
+    parser = argparse.ArgumentParser( description='Convert topology and event text files to the binary format.' )
+    parser.add_argument( 'kind', choices=( 'topology', 'events' ) )
+    parser.add_argument( 'text_file' )
+    parser.add_argument( 'binary_file' )
+    args = parser.parse_args( argv )
+
+    try:
+        if args.kind == 'topology':
+            text_to_binary_topology( args.text_file, args.binary_file )
+        else:
+            text_to_binary_events( args.text_file, args.binary_file )
+    except ValueError as error:
+        sys.exit( str( error ) )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+On-disk cache of simulation results. Simulations are deterministic given their
+inputs, so a result can be keyed by a content hash of the parsed network, its
+events in the order they happen, the algorithm variant, verbosity and
+stability limits. The key is taken from the parsed inputs rather than the
+files, so differences in formatting, comments or the text or binary format do
+not matter. Neither does the engine or routing table class used, as every one
+gives the same output.
+
+Each entry is a gzip compressed pickle in the cache directory. When the
+directory grows past its size bound, the least recently used entries are
+removed, by file modification time, which a hit refreshes.
+"""
+import gzip, hashlib, os, pickle, tempfile
+
+#bumped whenever what is cached or how results are computed changes
+CACHE_VERSION = 2
+
+DEFAULT_CACHE_BYTES = 256 << 20
+
+"""
+Returns the cache key of a simulation: a hex digest of the network's vertex
+order and links, the events in the order they happen, the algorithm variant,
+verbosity and stability limits.
+"""
+def scenario_key( network, events, algoType, verbose, limits ):
+    digest = hashlib.sha256()
+    links  = sorted(
+        ( min( edge.v1, edge.v2 ), max( edge.v1, edge.v2 ), network.getEdgeCost( edge.v1, edge.v2 ) )
+        for edge in network.edges
+    )
+
+    digest.update( repr( ( CACHE_VERSION, algoType, bool( verbose ), limits.maxHops, limits.maxCost, limits.maxRises, limits.maxRounds ) ).encode() )
+    digest.update( repr( list( network.vertices ) ).encode() )
+    digest.update( repr( links ).encode() )
+
+    for e in events:
+        digest.update( repr( ( e.roundNum, e.router1, e.router2, e.cost ) ).encode() )
+
+    return digest.hexdigest()
+
+"""
+A size-bounded, least recently used cache of results in a directory. Entries
+are any picklable value, but should only hold plain data, so that every
+program sharing the cache can load them. Several processes may share a cache
+directory, as entries are written to a temporary file and moved into place.
+"""
+class ResultCache:
+    def __init__( self, directory, maxBytes=DEFAULT_CACHE_BYTES ):
+        self.directory = directory
+        self.maxBytes  = maxBytes
+
+        os.makedirs( directory, exist_ok=True )
+
+    #returns the file of an entry
+    def path( self, key ):
+        return os.path.join( self.directory, key + '.pkl.gz' )
+
+    #returns the entry for a key, marking it as recently used, or None
+    def get( self, key ):
+        path = self.path( key )
+
+        try:
+            with gzip.open( path, 'rb' ) as handle:
+                entry = pickle.load( handle )
+
+            os.utime( path )
+        #an entry that fails to load for any reason is a miss
+        except ( EOFError, OSError, pickle.UnpicklingError, AttributeError, ImportError, IndexError, TypeError, ValueError ):
+            return None
+
+        return entry
+
+    #stores the entry for a key, then evicts entries past the size bound
+    def put( self, key, entry ):
+        handle, temporary = tempfile.mkstemp( dir=self.directory, suffix='.tmp' )
+
+        with os.fdopen( handle, 'wb' ) as raw, gzip.GzipFile( fileobj=raw, mode='wb' ) as writer:
+            pickle.dump( entry, writer, pickle.HIGHEST_PROTOCOL )
+
+        os.replace( temporary, self.path( key ) )
+        self.evict()
+
+    #removes the least recently used entries until the cache fits its bound
+    def evict( self ):
+        entries = []
+
+        for name in os.listdir( self.directory ):
+            if not name.endswith( '.pkl.gz' ):
+                continue
+
+            try:
+                stat = os.stat( os.path.join( self.directory, name ) )
+            except FileNotFoundError:
+                continue
+
+            entries.append( ( stat.st_mtime, stat.st_size, name ) )
+
+        total = sum( size for mtime, size, name in entries )
+
+        for mtime, size, name in sorted( entries ):
+            if total <= self.maxBytes:
+                break
+
+            try:
+                os.remove( os.path.join( self.directory, name ) )
+            except FileNotFoundError:
+                pass
+
+            total -= size
@@ -1,31 +1,39 @@
-import functools
+import heapq
 
 """
 This class holds a queue of events based on the passed in events file, and
-allows access to queue members.
+allows access to queue members. The queue is a heap ordered by round number,
+with events of the same round kept in the order they were added, so events can
+be added at any time, including while a simulation is running.
 """
 class EventQueue:
     def __init__( self ):
         self.queue = []
+        self.count = 0
 
     #add events to the queue
     def addEvent( self, event ):
-        self.queue.append( event )
+        heapq.heappush( self.queue, ( event.roundNum, self.count, event ) )
+        self.count += 1
 
-    #prepare the queue
+    #add many events to the queue at once, in the order given
+    def addEvents( self, events ):
+        for event in events:
+            self.queue.append( ( event.roundNum, self.count, event ) )
+            self.count += 1
+
+        heapq.heapify( self.queue )
+
+    #prepare the queue. The heap is always ordered, so there is nothing to do.
     def prepare( self ):
-        self.queue = sorted(
-            self.queue,
-            key=functools.cmp_to_key( lambda x, y: ( x.roundNum > y.roundNum ) - ( x.roundNum < y.roundNum ) )
-        )
+        pass
 
     #get events for a given round number, return as a list
     def getEvents( self, roundNum ):
         events = []
 
-        while self.queue and self.queue[0].roundNum == roundNum:
-            events.append( self.queue[0] )
-            self.queue = self.queue[1:]
+        while self.queue and self.queue[0][0] == roundNum:
+            events.append( heapq.heappop( self.queue )[2] )
 
         return events
 
@@ -33,11 +41,60 @@ class EventQueue:
     def hasEvents( self ):
         return len( self.queue ) > 0
 
+    #returns the round number of the next event, or None if there are none
+    def nextRound( self ):
+        return self.queue[0][0] if self.queue else None
+
+    #iterates over the queued events in the order they happen, leaving them
+    #queued
+    def __iter__( self ):
+        return ( entry[2] for entry in sorted( self.queue ) )
+
+    def __str__( self ):
+        return str( [ entry[2] for entry in sorted( self.queue ) ] )
+
+"""
+This class reads events lazily from an iterable of events already sorted by
+round number, such as a generator over an events file, holding only the events
+of the round being fetched. It provides the same access methods as EventQueue.
+"""
+class EventStream:
+    def __init__( self, events ):
+        self.events  = iter( events )
+        self.pending = next( self.events, None )
+
+    #get events for a given round number, return as a list
+    def getEvents( self, roundNum ):
+        events = []
+
+        while self.pending is not None and self.pending.roundNum == roundNum:
+            events.append( self.pending )
+            self.pending = next( self.events, None )
+
+        return events
+
+    #returns if there are any events
+    def hasEvents( self ):
+        return self.pending is not None
+
+    #returns the round number of the next event, or None if there are none
+    def nextRound( self ):
+        return self.pending.roundNum if self.pending is not None else None
+
+    #iterates over the events left in the order they happen. A stream can only
+    #be read once, so this uses them up.
+    def __iter__( self ):
+        while self.pending is not None:
+            yield self.pending
+            self.pending = next( self.events, None )
+
     def __str__( self ):
-        return str( self.queue )
+        return 'EventStream(next: ' + str( self.pending ) + ')'
 
 #class to represent an event. Holds the round num, involved nodes, and cost
 class Event:
+    __slots__ = ( 'roundNum', 'router1', 'router2', 'cost' )
+
     def __init__( self, roundNum, router1, router2, cost ):
         self.roundNum = roundNum
         self.router1  = router1
@@ -0,0 +1,278 @@
+#!/usr/bin/python3
+"""
+This file generates synthetic topology and event files for the simulator.
+Topologies are connected, use router labels 1..N, and are reproducible from
+their seed. Events only ever remove links that exist at that round.
+"""
+import argparse, math, random
+
+import binary
+
+TOPOLOGIES = ( 'ring', 'grid', 'geometric', 'barabasi-albert', 'fat-tree' )
+
+"""
+A ring of n routers.
+"""
+def ring_topology( n, rng ):
+    if n < 3:
+        raise ValueError( 'a ring needs at least 3 routers' )
+
+    edges = {}
+
+    for i in range( 1, n + 1 ):
+        edges[( i, i % n + 1 )] = rng.randint( 1, 20 )
+
+    return n, edges
+
+"""
+A grid as close to square as possible, with n routers filled in row by row.
+"""
+def grid_topology( n, rng ):
+    width = max( 1, int( math.ceil( math.sqrt( n ) ) ) )
+    edges = {}
+
+    for i in range( 1, n + 1 ):
+        if i % width != 0 and i + 1 <= n:
+            edges[( i, i + 1 )] = rng.randint( 1, 20 )
+
+        if i + width <= n:
+            edges[( i, i + width )] = rng.randint( 1, 20 )
+
+    return n, edges
+
+"""
+Routers placed at random in the unit square and linked to every router within
+a radius that makes the graph connected with high probability, with costs
+proportional to distance. Any remaining components are chained together.
+"""
+def geometric_topology( n, rng ):
+    radius = math.sqrt( 2.0 * math.log( max( n, 2 ) ) / ( math.pi * n ) )
+    points = [ ( rng.random(), rng.random() ) for i in range( n ) ]
+    cells  = {}
+    edges  = {}
+
+    #bucket the points so only neighboring cells are compared
+    for i, ( x, y ) in enumerate( points ):
+        cells.setdefault( ( int( x / radius ), int( y / radius ) ), [] ).append( i )
+
+    for ( cx, cy ), members in cells.items():
+        for dx in ( -1, 0, 1 ):
+            for dy in ( -1, 0, 1 ):
+                for i in members:
+                    for j in cells.get( ( cx + dx, cy + dy ), () ):
+                        if i < j:
+                            distance = math.dist( points[i], points[j] )
+
+                            if distance <= radius:
+                                edges[( i + 1, j + 1 )] = max( 1, int( math.ceil( distance * 100 ) ) )
+
+    connect_components( n, edges, rng )
+    return n, edges
+
+"""
+A Barabasi-Albert preferential attachment graph, where each new router links to
+m existing routers chosen with probability proportional to their degree.
+"""
+def barabasi_albert_topology( n, rng, m=2 ):
+    edges   = {}
+    targets = list( range( 1, min( m, n ) + 1 ) )
+    repeats = []
+
+    for i in range( 2, min( m, n ) + 1 ):
+        edges[( i - 1, i )] = rng.randint( 1, 20 )
+        repeats.extend( ( i - 1, i ) )
+
+    for i in range( m + 1, n + 1 ):
+        chosen = set()
+
+        while len( chosen ) < m:
+            chosen.add( rng.choice( repeats ) if repeats else rng.choice( targets ) )
+
+        for target in chosen:
+            edges[( target, i )] = rng.randint( 1, 20 )
+            repeats.extend( ( target, i ) )
+
+    return n, edges
+
+"""
+The switches of a k-ary fat tree, with k the smallest even number giving at
+least n switches ( 5k^2/4 ), so the router count is rounded up.
+"""
+def fat_tree_topology( n, rng ):
+    k = 2
+
+    while 5 * k * k // 4 < n:
+        k += 2
+
+    half     = k // 2
+    num_core = half * half
+    core     = list( range( 1, num_core + 1 ) )
+    label    = num_core + 1
+    edges    = {}
+
+    for pod in range( k ):
+        pod_aggregation = list( range( label, label + half ) )
+        pod_edge        = list( range( label + half, label + k ) )
+        label          += k
+
+        for a in pod_aggregation:
+            for e in pod_edge:
+                edges[( a, e )] = rng.randint( 1, 20 )
+
+        for i, a in enumerate( pod_aggregation ):
+            for c in core[i * half:( i + 1 ) * half]:
+                edges[( c, a )] = rng.randint( 1, 20 )
+
+    return label - 1, edges
+
+"""
+Links the connected components of a graph into a chain, in place.
+"""
+def connect_components( n, edges, rng ):
+    parent = list( range( n + 1 ) )
+
+    def find( x ):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x         = parent[x]
+
+        return x
+
+    for a, b in edges:
+        parent[find( a )] = find( b )
+
+    roots = []
+
+    for i in range( 1, n + 1 ):
+        if find( i ) == i:
+            roots.append( i )
+
+    for a, b in zip( roots, roots[1:] ):
+        edges[( a, b )] = rng.randint( 1, 20 )
+        parent[find( a )] = find( b )
+
+"""
+Generates a topology of the given kind and size. Returns the number of routers
+and a map of ( router1, router2 ) links to their costs.
+"""
+def generate_topology( kind, n, seed=0 ):
+    rng = random.Random( seed )
+
+    if kind == 'ring':
+        return ring_topology( n, rng )
+    elif kind == 'grid':
+        return grid_topology( n, rng )
+    elif kind == 'geometric':
+        return geometric_topology( n, rng )
+    elif kind == 'barabasi-albert':
+        return barabasi_albert_topology( n, rng )
+    elif kind == 'fat-tree':
+        return fat_tree_topology( n, rng )
+
+    raise ValueError( 'unknown topology: {}'.format( kind ) )
+
+"""
+Generates events for a topology: link failures, cost changes and flapping links
+that go down and come back up after period rounds. A failed or flapping link is
+not picked for any later event. Events start at the given round and are spaced
+apart by the given number of rounds. Returns a list of ( round, router1,
+router2, cost ) tuples sorted by round.
+"""
+def generate_events( edges, failures=0, cost_changes=0, flaps=0, start=10, spacing=10, period=5, seed=0 ):
+    rng       = random.Random( seed )
+    current   = dict( edges )
+    events    = []
+    kinds     = [ 'failure' ] * failures + [ 'cost' ] * cost_changes + [ 'flap' ] * flaps
+    round_num = start
+
+    rng.shuffle( kinds )
+
+    for kind in kinds:
+        if not current:
+            break
+
+        link = rng.choice( sorted( current ) )
+
+        if kind == 'failure':
+            events.append( ( round_num, link[0], link[1], -1 ) )
+            del current[link]
+        elif kind == 'cost':
+            cost = rng.randint( 1, 40 )
+            events.append( ( round_num, link[0], link[1], cost ) )
+            current[link] = cost
+        else:
+            events.append( ( round_num, link[0], link[1], -1 ) )
+            events.append( ( round_num + period, link[0], link[1], current.pop( link ) ) )
+
+        round_num += spacing
+
+    return sorted( events, key=lambda e: e[0] )
+
+"""
+Writes a topology in the simulator's topology file format.
+"""
+def write_topology( filename, num_routers, edges ):
+    with open( filename, 'w' ) as handle:
+        handle.write( '{}\n'.format( num_routers ) )
+
+        for ( router1, router2 ), cost in edges.items():
+            handle.write( '{} {} {}\n'.format( router1, router2, cost ) )
+
+"""
+Writes events in the simulator's event file format.
+"""
+def write_events( filename, events ):
+    with open( filename, 'w' ) as handle:
+        for event in events:
+            handle.write( '{} {} {} {}\n'.format( *event ) )
+
+"""
+Writes a topology in the binary topology format.
+"""
+def write_binary_topology( filename, num_routers, edges ):
+    records = [ ( router1, router2, cost ) for ( router1, router2 ), cost in edges.items() ]
+    binary.write_records( filename, binary.TOPOLOGY_MAGIC, num_routers, binary.TOPOLOGY_RECORD, records )
+
+"""
+Writes events in the binary event format.
+"""
+def write_binary_events( filename, events ):
+    binary.write_records( filename, binary.EVENT_MAGIC, 0, binary.EVENT_RECORD, events )
+
+"""
+Main function, runs on command line call.
+"""
+def main( argv=None ):
+    parser = argparse.ArgumentParser( description='Generate synthetic topology and event files.' )
+    parser.add_argument( 'kind', choices=TOPOLOGIES )
+    parser.add_argument( 'routers', type=int, help='number of routers ( rounded up for fat-tree )' )
+    parser.add_argument( 'topology_file' )
+    parser.add_argument( 'event_file' )
+    parser.add_argument( '--seed', type=int, default=0 )
+    parser.add_argument( '--failures', type=int, default=1 )
+    parser.add_argument( '--cost-changes', type=int, default=1 )
+    parser.add_argument( '--flaps', type=int, default=0 )
+    parser.add_argument( '--start', type=int, default=10, help='round of the first event' )
+    parser.add_argument( '--spacing', type=int, default=10, help='rounds between events' )
+    parser.add_argument( '--period', type=int, default=5, help='rounds a flapping link stays down' )
+    parser.add_argument( '--binary', action='store_true', help='write the binary format instead of text' )
+    args = parser.parse_args( argv )
+
+    if args.start < 2:
+        parser.error( 'events cannot start before round 2, the first round simulated' )
+
+    num_routers, edges = generate_topology( args.kind, args.routers, args.seed )
+    events = generate_events(
+        edges, args.failures, args.cost_changes, args.flaps,
+        args.start, args.spacing, args.period, args.seed
+    )
+
+    if args.binary:
+        write_binary_topology( args.topology_file, num_routers, edges )
+        write_binary_events( args.event_file, events )
+    else:
+        write_topology( args.topology_file, num_routers, edges )
+        write_events( args.event_file, events )
+
+if __name__ == "__main__":
+    main()
@@ -4,20 +4,28 @@ Contains method needed to update the graph.
 """
 class Graph:
     def __init__( self ):
-        self.vertices = {}
-        self.edges    = set()
+        self.vertices  = {}
+        self.edges     = set()
+        self.adjacency = {}
 
     #adds a vertex to the graph
     def addVertex( self, label, data ):
         self.vertices[label] = data
 
-    #adds an edge to the graph
+    #adds an edge to the graph, keeping the existing edge if already present
     def addEdge( self, e ):
+        if e in self.edges:
+            return
+
         self.edges.add( e )
+        self.adjacency.setdefault( e.v1, {} )[e.v2] = e.cost
+        self.adjacency.setdefault( e.v2, {} )[e.v1] = e.cost
 
     #removes an edge from the graph
     def removeEdge( self, e ):
         self.edges.remove( e )
+        self.adjacency[e.v1].pop( e.v2, None )
+        self.adjacency[e.v2].pop( e.v1, None )
 
     #updates a graph's affected edges and vertices from a given list of events.
     def updateGraph(self, e):
@@ -26,7 +34,7 @@ class Graph:
 
             if event.cost >= 0:
                 if edge in self.edges:
-                    self.edges.remove( edge )
+                    self.removeEdge( edge )
 
                 self.addEdge(edge)
             else:
@@ -40,26 +48,15 @@ class Graph:
     def getVertexData( self, v ):
         return self.vertices[v]
 
-    #returns a list of neighbor vertices to the passed in vertice
+    #returns a map of neighbor vertices to the passed in vertice and their
+    #edge costs. The map is the live adjacency index, so callers must not
+    #modify it.
     def getNeighbors( self, v ):
-        neighbors = {}
-
-        for edge in self.edges:
-            if edge.v1 == v:
-                neighbors[edge.v2] = edge.cost
-            elif edge.v2 == v:
-                neighbors[edge.v1] = edge.cost
-
-        return neighbors
+        return self.adjacency.get( v, {} )
 
     #reutrns the cost of the edge between two nodes, if it exists
     def getEdgeCost( self, v1, v2 ):
-        for edge in self.edges:
-            if    ( edge.v1 == v1 and edge.v2 == v2 ) \
-               or ( edge.v1 == v2 and edge.v2 == v1 ):
-                return edge.cost
-
-        return None
+        return self.adjacency.get( v1, {} ).get( v2 )
 
     def __str__( self ):
         vStr = ''
@@ -81,16 +78,20 @@ Class to represent an edge in the graph. Consists of two vertices and the edge
 cost.
 """
 class Edge:
+    __slots__ = ( 'v1', 'v2', 'cost' )
+
     def __init__( self, v1, v2, cost ):
         self.v1   = v1
         self.v2   = v2
         self.cost = cost
 
+    #the same for either direction, and distinct for every pair of router labels
+    #below 2^32
     def __hash__( self ):
-        hashCode = 1
-        hashCode = 31 * hash( self.v1 )
-        hashCode = hashCode + ( 31 * hash( self.v2 ) )
-        return hashCode
+        if self.v1 <= self.v2:
+            return ( self.v1 << 32 ) | self.v2
+
+        return ( self.v2 << 32 ) | self.v1
 
     def __eq__( self, other ):
         if self.v1 == other.v1:
@@ -0,0 +1,217 @@
+"""
+Dirty-set distance vector engine. Each round only the routers flagged for
+updates send, in the graph's vertex order, and a sender only processes the
+destinations whose advertised entry changed since it last sent, plus entries
+its neighbor may now answer differently. The outcome of every other entry is
+known without looking at it, so rounds cost time proportional to what changed
+while producing the same tables and flags as the per-router iter_* loops in
+simulator.py.
+
+For each directed link the engine classifies the destinations the sender
+advertises:
+    clean    - the receiver stores exactly what the sender would send, so the
+               receiver accepts it again without changing anything
+    rejected - the receiver keeps a lower cost and will reject it again until
+               its least cost path for that destination goes via the sender
+    pending  - anything else, processed on the sender's next send
+Destinations in none of these sets are never accepted, as the sender has no
+path to advertise, skips it under split horizon, or it is the receiver itself.
+"""
+import heapq, math
+
+class IncrementalNetwork:
+    #wraps a set up network. Everything starts out dirty, so the first round
+    #processes every entry just like the per-router loops.
+    def __init__( self, network ):
+        self.network    = network
+        self.numRouters = len( network.vertices )
+        self.order      = { vertex: position for position, vertex in enumerate( network.vertices ) }
+        self.advertised = { vertex: [ None for i in range( self.numRouters ) ] for vertex in network.vertices }
+        self.unsent     = { vertex: set( range( self.numRouters ) ) for vertex in network.vertices }
+        self.refresh    = { vertex: set( range( self.numRouters ) ) for vertex in network.vertices }
+        self.recompute  = { vertex: set( range( self.numRouters ) ) for vertex in network.vertices }
+
+        #per directed link ( sender, receiver ). A link missing from pending,
+        #or mapped to None, has every destination pending.
+        self.clean    = {}
+        self.rejected = {}
+        self.pending  = {}
+
+    #marks the parts of the network changed by a round's events as dirty. Must
+    #be called after the events have been applied with update_network.
+    def noteEvents( self, events ):
+        for e in events:
+            routers = set( ( e.router1, e.router2 ) )
+
+            for r in ( e.router1, e.router2 ):
+                routers.update( self.network.getNeighbors( r ) )
+
+            for r in routers:
+                self.refresh[r].update( range( self.numRouters ) )
+                self.recompute[r].update( range( self.numRouters ) )
+
+            for r in ( e.router1, e.router2 ):
+                self.pending[( e.router1, e.router2 )] = None
+                self.pending[( e.router2, e.router1 )] = None
+
+                for neighbor in self.network.getNeighbors( r ):
+                    self.pending[( r, neighbor )] = None
+
+    #brings the round-start snapshot of advertised entries up to date, noting
+    #the entries that changed since each router last sent. Must be called at
+    #the start of every round, before iterate.
+    def snapshot( self ):
+        for vertex, rows in self.refresh.items():
+            if not rows:
+                continue
+
+            router     = self.network.vertices[vertex]
+            advertised = self.advertised[vertex]
+            unsent     = self.unsent[vertex]
+
+            for c in rows:
+                via = int( router.via[c] )
+
+                if via == 0:
+                    entry = None
+                else:
+                    entry = ( router.getCost( c + 1, via ), router.getNumHops( c + 1, via ), router.hops[c] )
+
+                if entry != advertised[c]:
+                    advertised[c] = entry
+                    unsent.add( c )
+
+            rows.clear()
+
+    #sends the dirty entries of a router's distance vector to one neighbor.
+    #Returns if the neighbor accepted anything.
+    def send( self, vertex, neighbor, splitHorizon, poisonReverse, counters ):
+        link       = ( vertex, neighbor )
+        receiver   = self.network.vertices[neighbor]
+        advertised = self.advertised[vertex]
+        clean      = self.clean.setdefault( link, set() )
+        rejected   = self.rejected.setdefault( link, set() )
+        pending    = self.pending.get( link )
+
+        if pending is None:
+            rows = range( self.numRouters )
+        else:
+            rows = self.unsent[vertex] | pending
+
+        additional   = receiver.getCost( vertex, vertex )
+        accepted     = False
+        cleanSkipped = len( clean )
+
+        for c in rows:
+            if c in clean:
+                clean.remove( c )
+                cleanSkipped -= 1
+
+            rejected.discard( c )
+            to_router = c + 1
+            entry     = advertised[c]
+
+            #skip ourselves, and entries with nothing to advertise
+            if to_router == vertex or entry is None or entry[0] is None:
+                continue
+
+            existing_cost, existing_hops, next_hop = entry
+
+            if next_hop != neighbor:
+                new_cost = existing_cost + additional
+            elif poisonReverse:
+                new_cost = math.inf
+            elif splitHorizon:
+                continue
+            else:
+                new_cost = existing_cost + additional
+
+            counters['set_cost_calls'] += 1
+
+            if receiver.setCost( to_router, vertex, new_cost ):
+                counters['accepted_updates'] += 1
+                receiver.setNumHops( to_router, vertex, 1 + existing_hops )
+                self.refresh[neighbor].add( c )
+                self.recompute[neighbor].add( c )
+                clean.add( c )
+                accepted = True
+            elif to_router != neighbor:
+                rejected.add( c )
+
+        self.pending[link] = set()
+
+        #clean entries would be accepted again unchanged
+        return accepted or cleanSkipped > 0
+
+    #runs one round of the basic algorithm, optionally with split horizon and
+    #poison reverse, setting update flags for routers whose tables changed.
+    #Work done is added to the given counters, if any. Returns if anything
+    #changed at all.
+    def iterate( self, updates, splitHorizon=False, poisonReverse=False, counters=None ):
+        if counters is None:
+            counters = { 'messages': 0, 'set_cost_calls': 0, 'accepted_updates': 0 }
+
+        changed = False
+        dirty   = [ ( self.order[vertex], vertex ) for vertex in self.network.vertices if updates[vertex] ]
+        heapq.heapify( dirty )
+
+        while dirty:
+            position, vertex = heapq.heappop( dirty )
+
+            for neighbor in self.network.getNeighbors( vertex ):
+                if neighbor == vertex:
+                    continue
+
+                counters['messages'] += 1
+
+                if not self.send( vertex, neighbor, splitHorizon, poisonReverse, counters ):
+                    continue
+
+                changed = True
+
+                #a router flagged by an earlier sender in the round sends this round too
+                if not updates[neighbor]:
+                    updates[neighbor] = True
+
+                    if self.order[neighbor] > position:
+                        heapq.heappush( dirty, ( self.order[neighbor], neighbor ) )
+
+            self.unsent[vertex].clear()
+
+        return changed
+
+    #updates the least cost coordinates in the rows changed this round.
+    #Returns the update flag of every router, keyed by router label.
+    def updateCoordinates( self ):
+        flags = {}
+
+        for vertex, rows in self.recompute.items():
+            if not rows:
+                flags[vertex] = False
+                continue
+
+            router = self.network.vertices[vertex]
+            before = { c: int( router.via[c] ) for c in rows }
+            flags[vertex] = router.updateCoordinates( sorted( rows ) )
+
+            for c in rows:
+                via = int( router.via[c] )
+
+                if via == before[c]:
+                    continue
+
+                self.refresh[vertex].add( c )
+
+                #a rejected entry is accepted again once it is from the new next hop
+                if via != 0:
+                    link = ( via, vertex )
+
+                    if c in self.rejected.get( link, () ):
+                        self.rejected[link].remove( c )
+
+                        if self.pending.get( link ) is not None:
+                            self.pending[link].add( c )
+
+            rows.clear()
+
+        return flags
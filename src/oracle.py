@@ -0,0 +1,144 @@
+"""
+Reference oracle for the simulator. Computes the least cost table distance
+vector routing would ideally converge to straight from a network's graph, with
+Dijkstra's algorithm run once per destination, in the same ( next hop, cost,
+hop count ) form as tableize. Ties between equally cheap next hops go to the
+lowest router label and hop counts follow the chosen next hops, as in the
+routing tables. Link costs must be positive.
+
+The simulated routers only advertise again when one of their next hops
+changes, so a cost or hop count that changes through the same next hop is
+never passed on, and after events the table they settle on can hold dearer,
+cheaper or stale entries that the least cost table does not. The oracle
+therefore checks a simulation's final table only for what the simulation
+guarantees, and reports how it differs from the least cost table separately.
+"""
+import heapq
+
+"""
+Applies every remaining event of an event queue or stream to a network's
+graph, leaving the graph as it is once the last event has happened.
+"""
+def apply_events( network, events ):
+    while events.hasEvents():
+        network.updateGraph( events.getEvents( events.nextRound() ) )
+
+"""
+Runs Dijkstra's algorithm outward from a destination. Returns the least cost
+of every router that can reach it, and the routers in the order they were
+settled, closest first. Raises a ValueError on a link that does not cost more
+than 0, as the least costs would not settle in order.
+"""
+def shortest_paths_to( network, destination ):
+    costs   = { destination: 0 }
+    settled = []
+    done    = set()
+    heap    = [ ( 0, destination ) ]
+
+    while heap:
+        cost, vertex = heapq.heappop( heap )
+
+        if vertex in done:
+            continue
+
+        done.add( vertex )
+        settled.append( vertex )
+
+        for neighbor, link_cost in network.getNeighbors( vertex ).items():
+            if link_cost <= 0 and neighbor != vertex:
+                raise ValueError( 'link {}-{} costs {}, but link costs must be positive'.format( min( vertex, neighbor ), max( vertex, neighbor ), link_cost ) )
+
+            new_cost = cost + link_cost
+
+            if neighbor not in costs or new_cost < costs[neighbor]:
+                costs[neighbor] = new_cost
+                heapq.heappush( heap, ( new_cost, neighbor ) )
+
+    return costs, settled
+
+"""
+Returns the table the routers of a network converge to, in the form of
+tableize: a row per router of ( next hop, cost, hop count ) entries per
+destination, ( -1, -1, -1 ) for unreachable destinations. Raises a ValueError
+if a link does not cost more than 0.
+"""
+def shortest_path_table( network ):
+    num_routers = len( network.vertices )
+    table       = [ [ ( -1, -1, -1 ) for i in range( num_routers ) ] for j in range( num_routers ) ]
+
+    for destination in range( 1, num_routers + 1 ):
+        costs, settled = shortest_paths_to( network, destination )
+        hops           = { destination: 0 }
+
+        table[destination - 1][destination - 1] = ( destination, 0, 0 )
+
+        #next hops are settled before the routers using them
+        for router in settled[1:]:
+            cost, next_hop = min(
+                ( link_cost + costs[neighbor], neighbor )
+                for neighbor, link_cost in network.getNeighbors( router ).items()
+                if neighbor != router and neighbor in costs
+            )
+
+            hops[router] = 1 + hops[next_hop]
+            table[router - 1][destination - 1] = ( next_hop, cost, hops[router] )
+
+    return table
+
+"""
+Compares a table against the oracle's. Returns a list of ( router,
+destination, expected entry, actual entry ) for every entry that differs.
+"""
+def table_differences( expected, actual ):
+    differences = []
+
+    for router, ( expected_row, actual_row ) in enumerate( zip( expected, actual ) ):
+        for destination, ( expected_entry, actual_entry ) in enumerate( zip( expected_row, actual_row ) ):
+            if tuple( expected_entry ) != tuple( actual_entry ):
+                differences.append( ( router + 1, destination + 1, expected_entry, actual_entry ) )
+
+    return differences
+
+"""
+Checks a final table against what the simulation guarantees of it on the final
+network: every router reaches itself through itself at no cost, unreachable
+destinations are ( -1, -1, -1 ), and every other entry goes through a router
+that is still a neighbor, at a positive cost and hop count. Returns a list of
+( router, destination, entry, problem ) for every entry that breaks one.
+"""
+def table_violations( network, table ):
+    violations = []
+
+    for router, row in enumerate( table, 1 ):
+        neighbors = network.getNeighbors( router )
+
+        for destination, entry in enumerate( row, 1 ):
+            next_hop, cost, hops = entry
+
+            if destination == router:
+                problem = None if tuple( entry ) == ( router, 0, 0 ) else 'not itself at no cost'
+            elif next_hop == -1:
+                problem = None if tuple( entry ) == ( -1, -1, -1 ) else 'partly unreachable'
+            elif next_hop == router or next_hop not in neighbors:
+                problem = 'next hop is not a neighbor'
+            elif cost <= 0 or hops <= 0:
+                problem = 'cost or hop count is not positive'
+            else:
+                problem = None
+
+            if problem is not None:
+                violations.append( ( router, destination, entry, problem ) )
+
+    return violations
+
+"""
+Verifies a simulation's final table on the final network. Returns the entries
+that break what the simulation guarantees, as table_violations, and the entries
+that differ from the least cost table, as table_differences. The least cost
+table can be passed in when it has already been worked out.
+"""
+def verify_table( network, table, expected=None ):
+    if expected is None:
+        expected = shortest_path_table( network )
+
+    return table_violations( network, table ), table_differences( expected, table )
@@ -0,0 +1,305 @@
+"""
+This file parses the text topology and event files. A topology file is the
+number of routers on its first line, then one <router1> <router2> <cost> link
+per line, and an event file is one <round> <router1> <router2> <cost> event per
+line. Blank lines are skipped and anything after a # is a comment. Events
+cannot come before round 2, the first round a simulation runs.
+
+A file is read in one go and split on whitespace into numbers, which are then
+checked in bulk. Only when that fails, or the file has comments, is it read
+again line by line, which also finds the line any error is on. Every error is a
+ValueError naming the file and line.
+
+Parsing a topology gives a Topology, the router count and links, rather than a
+Graph, so that routing tables are only allocated once a simulation starts.
+"""
+import gc
+from contextlib import contextmanager
+from operator import itemgetter
+
+from event import Event
+from graph import Graph, Edge
+
+TOPOLOGY_WIDTH = 3
+EVENT_WIDTH    = 4
+
+#simulations start at round 2, and only apply the events of the round they are on
+FIRST_EVENT_ROUND = 2
+
+"""
+Pauses the cyclic garbage collector while building the millions of objects of a
+large input, none of which can form cycles, as it would otherwise scan every
+one of them again and again.
+"""
+@contextmanager
+def collection_paused():
+    enabled = gc.isenabled()
+    gc.disable()
+
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+"""
+A parsed network: the number of routers declared and the ( router1, router2,
+cost ) links in the order they were read. It is cheap to pass to worker
+processes, each of which builds its own Graph.
+"""
+class Topology:
+    __slots__ = ( 'numRouters', 'links' )
+
+    def __init__( self, numRouters, links ):
+        self.numRouters = numRouters
+        self.links      = links
+
+    #builds the graph of the network, with a routing table of the given class
+    #for every router, or no tables if it is None. Vertices are added in the
+    #order routers first appear, and a repeated link keeps its first cost.
+    @collection_paused()
+    def toGraph( self, table_class=None ):
+        topology    = Graph()
+        vertices    = topology.vertices
+        adjacency   = topology.adjacency
+        num_routers = self.numRouters
+
+        for router1, router2, cost in self.links:
+            if router1 not in vertices:
+                topology.addVertex( router1, table_class( num_routers, router1 ) if table_class is not None else None )
+
+            if router2 not in vertices:
+                topology.addVertex( router2, table_class( num_routers, router2 ) if table_class is not None else None )
+
+            if router2 not in adjacency.get( router1, () ):
+                topology.addEdge( Edge( router1, router2, cost ) )
+
+        return topology
+
+    def __str__( self ):
+        return 'Topology(routers: {}, links: {})'.format( self.numRouters, len( self.links ) )
+
+"""
+Returns the numbers on a line, or None if it is blank or a comment. A line of
+the wrong width or with anything other than integers is reported.
+"""
+def parse_line( filename, line_num, line, width ):
+    fields = line.split( '#', 1 )[0].split()
+
+    if not fields:
+        return None
+
+    if len( fields ) != width:
+        raise ValueError( '{}:{}: expected {} numbers, found {}'.format( filename, line_num, width, len( fields ) ) )
+
+    try:
+        return [ int( field ) for field in fields ]
+    except ValueError:
+        raise ValueError( '{}:{}: not an integer: {}'.format( filename, line_num, line.strip() ) ) from None
+
+"""
+Yields the line number and numbers of every line of text that holds any,
+numbering lines from the given one.
+"""
+def numbered_lines( filename, text, width, first=1 ):
+    for line_num, line in enumerate( text.splitlines(), first ):
+        numbers = parse_line( filename, line_num, line, width )
+
+        if numbers is not None:
+            yield line_num, numbers
+
+"""
+Splits text into the columns of records of the given width, one record per
+line, or no columns if there are no records. Returns None if the text has
+comments, blank lines or a line of another width, so that it has to be read
+line by line.
+"""
+def bulk_columns( text, width ):
+    text = text.strip()
+
+    if not text:
+        return []
+
+    if '#' in text or set( map( len, map( str.split, text.split( '\n' ) ) ) ) != { width }:
+        return None
+
+    try:
+        numbers = list( map( int, text.split() ) )
+    except ValueError:
+        return None
+
+    return [ numbers[i::width] for i in range( width ) ]
+
+"""
+Checks a link or event against the number of routers, raising an error at the
+given location, a file and line or record.
+"""
+def check_record( location, num_routers, router1, router2, cost, link ):
+    for router in ( router1, router2 ):
+        if num_routers is not None and not 1 <= router <= num_routers:
+            raise ValueError( '{}: router {} is not between 1 and {}'.format( location, router, num_routers ) )
+        elif router < 1:
+            raise ValueError( '{}: router {} is not positive'.format( location, router ) )
+
+    if router1 == router2:
+        raise ValueError( '{}: router {} linked to itself'.format( location, router1 ) )
+
+    #a cost of 0 reads as no route to the routers, so a link must cost at least
+    #1, and an event can only remove a link with a negative cost
+    if link and cost < 1:
+        raise ValueError( '{}: link cost {} is not positive'.format( location, cost ) )
+    elif not link and cost == 0:
+        raise ValueError( '{}: event cost 0 is not positive, use -1 to remove the link'.format( location ) )
+
+"""
+Checks an event as check_record does, and that it does not come before the
+first round, as the simulation would never reach it.
+"""
+def check_event( location, num_routers, round_num, router1, router2, cost ):
+    if round_num < FIRST_EVENT_ROUND:
+        raise ValueError( '{}: event for round {} comes before the first round {}'.format( location, round_num, FIRST_EVENT_ROUND ) )
+
+    check_record( location, num_routers, router1, router2, cost, False )
+
+"""
+Returns if records, given as columns, all have routers between 1 and the
+number of routers, if given, and distinct, and values at least the minimum
+given for each column that has one. This is the bulk check; the one record at
+a time check finds what failed.
+"""
+def records_valid( columns, routers, minimums, num_routers ):
+    if not columns or not columns[0]:
+        return True
+
+    firsts  = columns[routers[0]]
+    seconds = columns[routers[1]]
+
+    if min( min( firsts ), min( seconds ) ) < 1:
+        return False
+
+    if num_routers is not None and max( max( firsts ), max( seconds ) ) > num_routers:
+        return False
+
+    if any( map( int.__eq__, firsts, seconds ) ):
+        return False
+
+    return all( min( columns[column] ) >= minimum for column, minimum in minimums.items() )
+
+"""
+Returns if links, given as columns, pass check_record.
+"""
+def links_valid( columns, num_routers ):
+    return records_valid( columns, ( 0, 1 ), { 2: 1 }, num_routers )
+
+"""
+Returns if events, given as columns, pass check_event.
+"""
+def events_valid( columns, num_routers ):
+    return records_valid( columns, ( 1, 2 ), { 0: FIRST_EVENT_ROUND }, num_routers ) and ( not columns or 0 not in columns[3] )
+
+"""
+Checks that the routers on the links of a topology are exactly those it
+declares, as the routers of a network are numbered 1 to its router count.
+"""
+def check_linked( filename, topology ):
+    linked   = set( map( itemgetter( 0 ), topology.links ) )
+    linked.update( map( itemgetter( 1 ), topology.links ) )
+    declared = set( range( 1, topology.numRouters + 1 ) )
+
+    if linked - declared:
+        raise ValueError( '{}: router {} is not between 1 and {}'.format( filename, min( linked - declared ), topology.numRouters ) )
+
+    if declared - linked:
+        raise ValueError( '{}: {} of {} routers have no links, first router {}'.format( filename, len( declared - linked ), topology.numRouters, min( declared - linked ) ) )
+
+    return topology
+
+"""
+Parses a text topology file into a Topology.
+"""
+@collection_paused()
+def parse_topology( filename ):
+    with open( filename, 'r' ) as handle:
+        text = handle.read()
+
+    #the router count is the first line holding anything but a comment
+    line_num = 1
+    start    = 0
+
+    while True:
+        end    = text.find( '\n', start )
+        end    = len( text ) if end < 0 else end
+        fields = text[start:end].split( '#', 1 )[0].split()
+
+        if fields:
+            break
+
+        if end == len( text ):
+            raise ValueError( '{}: no router count'.format( filename ) )
+
+        line_num += 1
+        start     = end + 1
+
+    if len( fields ) != 1 or not fields[0].isdigit():
+        raise ValueError( '{}:{}: expected the number of routers, found {}'.format( filename, line_num, text[start:end].strip() ) )
+
+    num_routers = int( fields[0] )
+    body        = text[end + 1:]
+    columns     = bulk_columns( body, TOPOLOGY_WIDTH )
+
+    if columns is not None and links_valid( columns, num_routers ):
+        return check_linked( filename, Topology( num_routers, list( zip( *columns ) ) ) )
+
+    links = []
+
+    for line_num, ( router1, router2, cost ) in numbered_lines( filename, body, TOPOLOGY_WIDTH, line_num + 1 ):
+        check_record( '{}:{}'.format( filename, line_num ), num_routers, router1, router2, cost, True )
+        links.append( ( router1, router2, cost ) )
+
+    return check_linked( filename, Topology( num_routers, links ) )
+
+"""
+Parses a text event file into a list of events in file order, checking the
+routers against the number of routers if it is given. A negative cost removes
+a link.
+"""
+@collection_paused()
+def parse_events( filename, num_routers=None ):
+    with open( filename, 'r' ) as handle:
+        text = handle.read()
+
+    columns = bulk_columns( text, EVENT_WIDTH )
+
+    if columns is not None and events_valid( columns, num_routers ):
+        return list( map( Event, *columns ) ) if columns else []
+
+    events = []
+
+    for line_num, ( round_num, router1, router2, cost ) in numbered_lines( filename, text, EVENT_WIDTH ):
+        check_event( '{}:{}'.format( filename, line_num ), num_routers, round_num, router1, router2, cost )
+        events.append( Event( round_num, router1, router2, cost ) )
+
+    return events
+
+"""
+Lazily reads events from a text event file already sorted by round number,
+yielding them one at a time, with the same checks as parse_events.
+"""
+def stream_events( filename, num_routers=None ):
+    last_round = None
+
+    with open( filename, 'r' ) as handle:
+        for line_num, line in enumerate( handle, 1 ):
+            numbers = parse_line( filename, line_num, line, EVENT_WIDTH )
+
+            if numbers is None:
+                continue
+
+            round_num, router1, router2, cost = numbers
+            check_event( '{}:{}'.format( filename, line_num ), num_routers, round_num, router1, router2, cost )
+
+            if last_round is not None and round_num < last_round:
+                raise ValueError( '{}:{}: event for round {} follows round {}; events must be sorted to be streamed'.format( filename, line_num, round_num, last_round ) )
+
+            last_round = round_num
+            yield Event( round_num, router1, router2, cost )
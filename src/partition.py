@@ -0,0 +1,484 @@
+#!/usr/bin/python3
+"""
+This file runs a simulation with the network split into regions, each simulated
+by a worker process of its own, for networks too large for one process. A
+simple partitioner grows the regions breadth first from unassigned routers, so
+each region is mostly connected and few links cross between regions.
+
+Every worker reads the topology itself and only keeps routing tables for the
+routers of its region, with a RemoteRouter standing in for every other router.
+Rounds are kept in step by the coordinating process. A round's events go to
+every worker, and each worker snapshots its routers and sends the messages
+between routers of its own region. The routers on a region's border that send
+are passed through pipes to the regions of their neighbors, along with the
+part of their distance vector that changed since that region last received
+it.
+
+Results are identical to the single-process rounds. The messages of a round
+carry round-start snapshots, and only the sender of a message writes to the
+entries it lands in, so messages may be delivered in any order. The one thing
+that depends on order is that a router woken by an earlier sender in the
+graph's vertex order sends in the same round. Workers follow such wakes inside
+their region at once, and wakes across regions take further exchanges until no
+region wakes another.
+"""
+import argparse, math, os, sys, traceback
+from collections import deque
+from multiprocessing import Pipe, Process
+
+from router import RoutingTable, numpy
+from simulator import VARIANTS, TABLES, BASIC, SPLIT_HORIZON_POISON_REVERSE, LIMIT_OPTIONS, Simulation, StabilityLimits, \
+                      setup_network, update_network, table_entry, file_to_topology, file_to_undirected_graph, \
+                      file_to_topological_events, file_to_event_stream, output_filename, open_output, \
+                      finish_output
+
+"""
+Splits the routers of a network into regions of at most ceil( routers / parts )
+routers, grown breadth first in vertex order. Returns the region of every
+router, keyed by router label.
+"""
+def partition_graph( network, parts ):
+    size  = -( -len( network.vertices ) // parts )
+    owner = {}
+
+    for seed in network.vertices:
+        if seed in owner:
+            continue
+
+        owner[seed] = len( owner ) // size
+        queue       = deque( [ seed ] )
+
+        while queue:
+            vertex = queue.popleft()
+
+            for neighbor in network.getNeighbors( vertex ):
+                if neighbor not in owner:
+                    owner[neighbor] = len( owner ) // size
+                    queue.append( neighbor )
+
+    return owner
+
+"""
+Stands in for the routing table of a router simulated by another worker, so
+that the network can be set up and updated from events as a whole. Writes to
+it are dropped, as the worker owning the router makes them itself.
+"""
+class RemoteRouter:
+    __slots__ = ( 'router', )
+
+    def __init__( self, numRouters, router ):
+        self.router = router
+
+    def setCost( self, to, via, cost ):
+        return False
+
+    def setCostFromEvent( self, to, via, cost ):
+        pass
+
+    def setNumHops( self, to, via, hops ):
+        pass
+
+    def setHop( self, to, via ):
+        pass
+
+    def setCoordinate( self, index1, index2 ):
+        pass
+
+"""
+The state of one region, kept by its worker process. The coordinator drives it
+through beginRound, receive and finishRound each round.
+"""
+class PartitionWorker:
+    def __init__( self, topology_filename, table_class, owner, part, algoType ):
+        self.owner      = owner
+        self.part       = part
+        self.algoType   = algoType
+        self.network    = file_to_undirected_graph( topology_filename, self.tableFactory( table_class ) )
+        self.numRouters = len( self.network.vertices )
+        self.owned      = [ vertex for vertex in self.network.vertices if owner[vertex] == part ]
+        self.order      = { vertex: position for position, vertex in enumerate( self.network.vertices ) }
+        self.updates    = { vertex: True for vertex in self.owned }
+        self.advertised = {}
+        self.remote     = {}
+        self.sent       = {}
+        self.sending    = set()
+        self.changed    = False
+
+        setup_network( self.network, False )
+
+    #returns a routing table class that only builds the routers of this region
+    def tableFactory( self, table_class ):
+        def build( numRouters, router ):
+            if self.owner[router] == self.part:
+                return table_class( numRouters, router )
+
+            return RemoteRouter( numRouters, router )
+
+        return build
+
+    #returns every table entry of the routers of this region
+    def initialEntries( self ):
+        entries = {}
+
+        for vertex in self.owned:
+            router = self.network.vertices[vertex]
+            entries[vertex] = [ ( i, table_entry( router, vertex - 1, i ) ) for i in range( self.numRouters ) ]
+            router.changedRows.clear()
+
+        return entries
+
+    #applies a round's events and snapshots this region's distance vectors,
+    #then sends the messages of its flagged routers. Returns the border
+    #routers that send, by the region they send to.
+    def beginRound( self, events ):
+        flagged = {}
+        update_network( self.network, events, flagged )
+
+        for vertex in flagged:
+            if self.owner[vertex] == self.part:
+                self.updates[vertex] = True
+
+        for vertex in self.owned:
+            router = self.network.vertices[vertex]
+            self.advertised[vertex] = [
+                None if entry is None else ( entry[0], entry[1], router.hops[c] )
+                for c, entry in enumerate( router.distanceVector() )
+            ]
+
+        self.sending = set( vertex for vertex in self.owned if self.updates[vertex] )
+        self.changed = False
+
+        return self.cascade( list( self.sending ) )
+
+    #takes in border routers of other regions that send this round, with the
+    #changes to their distance vectors, and delivers their messages. Returns
+    #the border routers of this region that were woken, by region.
+    def receive( self, senders ):
+        for vertex, delta in senders:
+            entries = self.remote.setdefault( vertex, [ None for i in range( self.numRouters ) ] )
+
+            for c, entry in delta:
+                entries[c] = entry
+
+        return self.cascade( [ vertex for vertex, delta in senders ] )
+
+    #delivers the messages of the given senders to their neighbors in this
+    #region, and those of every router of the region they wake in turn.
+    #Returns the border routers of this region among them, by region.
+    def cascade( self, senders ):
+        queue   = deque( senders )
+        reports = {}
+
+        while queue:
+            vertex = queue.popleft()
+
+            if self.owner[vertex] == self.part:
+                self.report( vertex, reports )
+
+            for neighbor in self.network.getNeighbors( vertex ):
+                if neighbor == vertex or self.owner[neighbor] != self.part:
+                    continue
+
+                #a router flagged by an earlier sender in the round sends this round too
+                if     self.deliver( vertex, neighbor ) \
+                   and self.order[vertex] < self.order[neighbor] \
+                   and neighbor not in self.sending:
+                    self.sending.add( neighbor )
+                    queue.append( neighbor )
+
+        return reports
+
+    #adds a sending router of this region to the reports for every other
+    #region it has neighbors in, with the entries changed since that region
+    #last received its distance vector
+    def report( self, vertex, reports ):
+        entries = self.advertised[vertex]
+        targets = set( self.owner[neighbor] for neighbor in self.network.getNeighbors( vertex ) )
+        targets.discard( self.part )
+
+        for target in targets:
+            last  = self.sent.get( ( vertex, target ) )
+            delta = [ ( c, entry ) for c, entry in enumerate( entries ) if last is None or last[c] != entry ]
+
+            self.sent[( vertex, target )] = entries
+            reports.setdefault( target, [] ).append( ( vertex, delta ) )
+
+    #sends a router's round-start distance vector to a neighbor in this
+    #region, as the iter_* loops do. Returns if the neighbor accepted anything.
+    def deliver( self, vertex, neighbor ):
+        entries    = self.advertised[vertex] if self.owner[vertex] == self.part else self.remote[vertex]
+        receiver   = self.network.vertices[neighbor]
+        additional = receiver.getCost( vertex, vertex )
+        changed    = False
+
+        for c, entry in enumerate( entries ):
+            #skip ourselves, and entries with nothing to advertise
+            if c + 1 == vertex or entry is None or entry[0] is None:
+                continue
+
+            cost, hops, next_hop = entry
+
+            if next_hop != neighbor or self.algoType == BASIC:
+                new_cost = cost + additional
+            elif self.algoType == SPLIT_HORIZON_POISON_REVERSE:
+                new_cost = math.inf
+            else:
+                continue
+
+            if receiver.setCost( c + 1, vertex, new_cost ):
+                receiver.setNumHops( c + 1, vertex, 1 + hops )
+                changed = True
+
+        if changed:
+            self.updates[neighbor] = True
+            self.changed           = True
+
+        return changed
+
+    #updates the least cost coordinates of this region's routers. Returns if
+    #anything changed this round, and the table entries that changed.
+    def finishRound( self ):
+        entries = {}
+
+        for vertex in self.owned:
+            self.updates[vertex] = self.network.vertices[vertex].updateCoordinates()
+
+        for vertex in self.owned:
+            router = self.network.vertices[vertex]
+
+            if router.changedRows:
+                entries[vertex] = [ ( i, table_entry( router, vertex - 1, i ) ) for i in router.changedRows ]
+                router.changedRows.clear()
+
+        return self.changed, entries
+
+"""
+Runs a worker process: builds the region's state, sends back its initial
+table entries, then carries out the coordinator's commands until told to
+stop. Replies are ( True, value ), or ( False, traceback ) on an error.
+"""
+def worker_main( connection, topology_filename, table_class, owner, part, algoType ):
+    try:
+        worker = PartitionWorker( topology_filename, table_class, owner, part, algoType )
+        connection.send( ( True, worker.initialEntries() ) )
+    except Exception:
+        connection.send( ( False, traceback.format_exc() ) )
+        return
+
+    while True:
+        command, args = connection.recv()
+
+        if command == 'stop':
+            break
+
+        try:
+            connection.send( ( True, getattr( worker, command )( *args ) ) )
+        except Exception:
+            connection.send( ( False, traceback.format_exc() ) )
+
+"""
+A simulation of one algorithm variant whose regions are simulated by worker
+processes. It keeps the table and looks for instabilities itself, exactly as a
+Simulation does, from the entries the workers report changed every round. It
+cannot be checkpointed: checkpoint raises a TypeError.
+"""
+class PartitionedSimulation( Simulation ):
+    def __init__( self, topology_filename, events, algoType, partitions, table_class=RoutingTable, verbose=False, output=None, limits=None ):
+        self.setupState( file_to_undirected_graph( topology_filename, RemoteRouter ), events, algoType, verbose, None, output, limits )
+
+        self.owner          = partition_graph( self.network, partitions )
+        self.connections    = []
+        self.processes      = []
+        self.pendingEntries = []
+
+        for part in range( max( self.owner.values() ) + 1 ):
+            parent, child = Pipe()
+            process       = Process( target=worker_main, args=( child, topology_filename, table_class, self.owner, part, algoType ), daemon=True )
+            process.start()
+            child.close()
+
+            self.connections.append( parent )
+            self.processes.append( process )
+
+        num_routers = len( self.network.vertices )
+        table       = [ [ None for i in range( num_routers ) ] for j in range( num_routers ) ]
+
+        for entries in self.collect():
+            for vertex, row in entries.items():
+                for i, entry in row:
+                    table[vertex - 1][i] = entry
+
+        self.startTable( table )
+
+    #sends a command to the workers at the given region indices, or to every
+    #worker, with the given arguments per worker or the same for all
+    def command( self, command, args=(), parts=None ):
+        parts = range( len( self.connections ) ) if parts is None else parts
+
+        for part in parts:
+            self.connections[part].send( ( command, args[part] if isinstance( args, dict ) else args ) )
+
+        return self.collect( parts )
+
+    #collects the replies of the workers at the given region indices
+    def collect( self, parts=None ):
+        replies = []
+
+        for part in ( range( len( self.connections ) ) if parts is None else parts ):
+            ok, value = self.connections[part].recv()
+
+            if not ok:
+                raise RuntimeError( 'worker for region {} failed:\n{}'.format( part, value ) )
+
+            replies.append( value )
+
+        return replies
+
+    #runs one round across the workers. Returns False once converged or
+    #unstable, True otherwise.
+    def step( self ):
+        if self.converged or self.instability is not None:
+            return False
+
+        round_events = self.events.getEvents( self.roundNum )
+
+        if len( round_events ) > 0:
+            self.network.updateGraph( round_events )
+            self.lastEventTime = self.roundNum
+
+        reports = self.command( 'beginRound', ( round_events, ) )
+
+        #border routers that send are passed on until no region wakes another
+        while any( reports ):
+            inbox = {}
+
+            for report in reports:
+                for target, senders in report.items():
+                    inbox.setdefault( target, [] ).extend( senders )
+
+            reports = self.command( 'receive', { part: ( senders, ) for part, senders in inbox.items() }, sorted( inbox ) )
+
+        changed = False
+
+        for worker_changed, entries in self.command( 'finishRound' ):
+            changed = changed or worker_changed
+            self.pendingEntries.append( entries )
+
+        return self.endRound( changed )
+
+    #brings the table up to date with the entries the workers reported
+    def refreshTable( self ):
+        for entries in self.pendingEntries:
+            for vertex, row in entries.items():
+                for i, entry in row:
+                    self.setEntry( vertex, i, entry )
+
+        self.pendingEntries = []
+
+    #a partitioned simulation's routing tables live in its workers, so it
+    #cannot be checkpointed; this raises a TypeError
+    def checkpoint( self, filename ):
+        raise TypeError( 'a PartitionedSimulation cannot be checkpointed, as its routing tables live in its worker processes; run it with a Simulation to checkpoint it' )
+
+    #runs rounds until the network converges, stops the workers and returns
+    #the result
+    def run( self ):
+        try:
+            return super().run()
+        finally:
+            self.close()
+
+    #stops the workers
+    def close( self ):
+        for connection in self.connections:
+            connection.send( ( 'stop', () ) )
+            connection.close()
+
+        for process in self.processes:
+            process.join()
+
+        self.connections = []
+        self.processes   = []
+
+"""
+Runs an algorithm variant partitioned into regions and writes its output file
+as simulator.py would. A run that fails, such as on a malformed event in a
+stream, leaves no output file behind. Returns the result.
+"""
+def run_partitioned( topology_filename, events, verbose, algoType, partitions, table_class, compress=False, limits=None ):
+    filename = output_filename( algoType, verbose, compress )
+    outfile  = open_output( filename )
+
+    try:
+        simulation = PartitionedSimulation( topology_filename, events, algoType, partitions, table_class, verbose, outfile if verbose else None, limits )
+        result     = simulation.run()
+    except Exception:
+        outfile.close()
+        os.remove( filename )
+        raise
+
+    finish_output( filename, outfile, result, verbose )
+    return result
+
+"""
+Main function, runs on command line call.
+"""
+def main( argv=None ):
+    parser = argparse.ArgumentParser( description='Run the simulation with the network partitioned across worker processes.' )
+    parser.add_argument( 'topology' )
+    parser.add_argument( 'events' )
+    parser.add_argument( 'verbose', type=int, choices=( 0, 1 ) )
+    parser.add_argument( '--partitions', type=int, default=os.cpu_count(), help='number of regions, each simulated by a worker process' )
+    parser.add_argument( '--table', default='list', choices=TABLES )
+    parser.add_argument( '--variants', default=','.join( VARIANTS ) )
+    parser.add_argument( '--stream-events', action='store_true', help='read the sorted event file lazily' )
+    parser.add_argument( '--gzip', action='store_true', help='write gzip compressed output' )
+
+    for name in LIMIT_OPTIONS:
+        parser.add_argument( '--' + name, type=int )
+
+    args     = parser.parse_args( argv )
+    variants = args.variants.split( ',' )
+    limits   = StabilityLimits()
+
+    for variant in variants:
+        if variant not in VARIANTS:
+            parser.error( 'unknown variant: {}'.format( variant ) )
+
+    if args.partitions < 1:
+        parser.error( '--partitions must be at least 1' )
+
+    if args.table == 'numpy' and numpy is None:
+        parser.error( '--table numpy needs numpy, which is not installed' )
+
+    for name, attribute in LIMIT_OPTIONS.items():
+        value = getattr( args, name.replace( '-', '_' ) )
+
+        if value is not None:
+            setattr( limits, attribute, value )
+
+    problems = []
+
+    #variants run one after another, each across all the workers, with the
+    #routers of the events checked against the topology's
+    try:
+        num_routers = file_to_topology( args.topology ).numRouters
+
+        for variant in variants:
+            if args.stream_events:
+                events = file_to_event_stream( args.events, num_routers )
+            else:
+                events = file_to_topological_events( args.events, num_routers )
+
+            result = run_partitioned( args.topology, events, args.verbose == 1, VARIANTS[variant], args.partitions, TABLES[args.table], args.gzip, limits )
+
+            if result.instability is not None:
+                problems.append( '{}: {}'.format( variant, result.instability ) )
+    except ValueError as error:
+        sys.exit( str( error ) )
+
+    if problems:
+        sys.exit( '\n'.join( problems ) )
+
+if __name__ == "__main__":
+    main()
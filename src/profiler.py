@@ -0,0 +1,68 @@
+"""
+Opt-in instrumentation for simulations. A Profiler records, for every round of
+every variant it is given, the time spent in each phase of the round and
+counters of the work done, and writes them out as a JSON or CSV trace.
+"""
+import csv, json, time
+from contextlib import contextmanager, nullcontext
+
+PHASES   = ( 'events', 'snapshot', 'advertise', 'coordinates', 'tableize', 'output' )
+COUNTERS = ( 'messages', 'set_cost_calls', 'accepted_updates', 'dirty_routers' )
+FIELDS   = [ 'variant', 'round' ] + [ phase + '_seconds' for phase in PHASES ] + list( COUNTERS )
+
+class Profiler:
+    def __init__( self, variant=None ):
+        self.variant = variant
+        self.rounds  = []
+        self.current = None
+
+    #starts recording a new round
+    def startRound( self, roundNum ):
+        self.current = { 'variant': self.variant, 'round': roundNum }
+
+        for phase in PHASES:
+            self.current[phase + '_seconds'] = 0.0
+
+        for counter in COUNTERS:
+            self.current[counter] = 0
+
+        self.rounds.append( self.current )
+
+    #returns the counters of the round being recorded, which engines add to
+    def counters( self ):
+        return self.current
+
+    #times a phase of the round being recorded
+    @contextmanager
+    def time( self, phase ):
+        start = time.perf_counter()
+
+        try:
+            yield
+        finally:
+            self.current[phase + '_seconds'] += time.perf_counter() - start
+
+    #writes the trace of every recorded round, as CSV if the file name ends in
+    #.csv and as JSON otherwise
+    def write( self, filename ):
+        write_trace( filename, self.rounds )
+
+"""
+Returns a context timing a phase with the given profiler, or doing nothing if
+there is no profiler.
+"""
+def phase( profiler, name ):
+    return profiler.time( name ) if profiler is not None else nullcontext()
+
+"""
+Writes a list of round records, as CSV if the file name ends in .csv and as
+JSON otherwise.
+"""
+def write_trace( filename, rounds ):
+    with open( filename, 'w', newline='' ) as handle:
+        if filename.endswith( '.csv' ):
+            writer = csv.DictWriter( handle, fieldnames=FIELDS )
+            writer.writeheader()
+            writer.writerows( rounds )
+        else:
+            json.dump( { 'rounds': rounds }, handle, indent=1 )
@@ -1,23 +1,36 @@
 import math
+from array import array
 from copy import deepcopy
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 """
 Class to represent a router's routing table and other stored values.
 Specifically, it contains a routing table, a table of number of hops for certain
 paths, pinters to the least cost values in the table, itself's label, and the
-next hops for the lowest cost paths.
+next hops for the lowest cost paths. The pointer to the least cost value of a
+row is the label of the via router it is in, or 0 if the row has none. It also
+collects the rows changed since the simulation last looked, so the output table
+can be kept up to date incrementally.
 """
 class RoutingTable:
+    __slots__ = ( 'table', 'numHops', 'via', 'router', 'hops', 'changedRows' )
+
     def __init__( self, numRouters, router ):
         self.table       = [ [ None for i in range( numRouters ) ] for j in range( numRouters ) ]
         self.numHops     = [ [ 0 for i in range( numRouters ) ] for j in range( numRouters ) ]
-        self.coordinates = [ None for i in range( numRouters ) ]
+        self.via         = array( 'i', [ 0 ] ) * numRouters
         self.router      = router
         self.hops        = [ None for i in range( numRouters ) ]
+        self.changedRows = set()
 
     #sets the number of hops it takes to get to a destination
     def setNumHops( self, to, via, hops ):
         self.numHops[to - 1][via - 1] = hops
+        self.changedRows.add( to - 1 )
 
     #returns the number of hops to a destination
     def getNumHops( self, to, via ):
@@ -30,6 +43,7 @@ class RoutingTable:
     #sets the cost in the routing table based on an event
     def setCostFromEvent( self, to, via, cost ):
         self.table[to - 1][via - 1] = cost
+        self.changedRows.add( to - 1 )
 
     #sets cost in the routing table to given value
     def setCost( self, to, via, cost ):
@@ -41,14 +55,18 @@ class RoutingTable:
         #node of least cost
         if    self.table[to - 1][via - 1] is None \
            or self.table[to - 1][via - 1] >= cost \
-           or self.coordinates[to - 1] == ( to, via ):
+           or self.via[to - 1] == via:
             self.table[to - 1][via - 1] = cost
+            self.changedRows.add( to - 1 )
             return True
 
         return False
 
     #sets the next hop for a given path
     def setHop( self, to, via ):
+        if self.hops[to - 1] != via:
+            self.changedRows.add( to - 1 )
+
         if to == self.router or via == self.router:
             self.hops[to-1] = via
         elif to == via:
@@ -58,27 +76,45 @@ class RoutingTable:
 
     #sets the coordinates of the least cost path in a row of the routing table
     def setCoordinate(self, index1, index2):
-        self.coordinates[index1 - 1] = (index1, index2)
+        self.via[index1 - 1] = index2
+        self.changedRows.add( index1 - 1 )
 
-    #updates all coordinates for least cost paths in each row of the routing table
-    def updateCoordinates( self ):
+    #updates all coordinates for least cost paths in each row of the routing
+    #table, or only in the given rows (0-based) when the others are unchanged
+    def updateCoordinates( self, rows=None ):
         ret = False
 
-        for c in range( 0, len( self.table ) ):
+        for c in ( range( 0, len( self.table ) ) if rows is None else rows ):
             if not any( self.table[c] ):
-                self.coordinates[c] = None
-                self.hops[c]        = 0
+                if self.via[c] != 0:
+                    self.changedRows.add( c )
+
+                self.via[c]  = 0
+                self.hops[c] = 0
                 continue
 
             col = self.table[c].index( min( x for x in self.table[c] if x is not None ) )
             self.setHop( c + 1, col + 1 )
 
-            if self.coordinates[c] != (c + 1, col + 1):
-                self.coordinates[c] = (c + 1, col + 1)
+            if self.via[c] != col + 1:
+                self.via[c] = col + 1
+                self.changedRows.add( c )
                 ret = True
 
         return ret
 
+    #returns the distance vector this router currently advertises: for each
+    #destination, a ( cost, hops ) pair of its least cost path, or None
+    def distanceVector( self ):
+        vector = [ None for i in range( len( self.via ) ) ]
+
+        for c in range( 0, len( self.via ) ):
+            if self.via[c] != 0:
+                via       = self.via[c] - 1
+                vector[c] = ( self.table[c][via], self.numHops[c][via] )
+
+        return vector
+
     #clones this router
     def clone( self ):
         return deepcopy( self )
@@ -100,3 +136,260 @@ class RoutingTable:
         tableStr += ''
 
         return tableStr
+
+"""
+Sparse variant of RoutingTable for large, low-degree networks, selected with
+the --sparse flag. A router only ever learns costs via its neighbors, so rather
+than dense numRouters x numRouters matrices, costs and hop counts are kept per
+destination row in maps keyed by the via router, and rows with nothing in them
+are not stored at all. Memory is O(numRouters * degree) per router. It exposes
+the same methods as RoutingTable and gives the same results.
+"""
+class SparseRoutingTable:
+    __slots__ = ( 'table', 'numHops', 'via', 'router', 'hops', 'changedRows' )
+
+    def __init__( self, numRouters, router ):
+        self.table       = {}
+        self.numHops     = {}
+        self.via         = array( 'i', [ 0 ] ) * numRouters
+        self.router      = router
+        self.hops        = [ None for i in range( numRouters ) ]
+        self.changedRows = set()
+
+    #sets the number of hops it takes to get to a destination
+    def setNumHops( self, to, via, hops ):
+        self.numHops.setdefault( to - 1, {} )[via] = hops
+        self.changedRows.add( to - 1 )
+
+    #returns the number of hops to a destination
+    def getNumHops( self, to, via ):
+        row = self.numHops.get( to - 1 )
+        return row.get( via, 0 ) if row is not None else 0
+
+    #returns the cost of a certain path in the routing table
+    def getCost( self, to, via ):
+        row = self.table.get( to - 1 )
+        return row.get( via ) if row is not None else None
+
+    #stores a cost, dropping the entry, and the row once empty, for None
+    def putCost( self, to, via, cost ):
+        if cost is not None:
+            self.table.setdefault( to - 1, {} )[via] = cost
+        elif to - 1 in self.table:
+            row = self.table[to - 1]
+            row.pop( via, None )
+
+            if not row:
+                del self.table[to - 1]
+
+        self.changedRows.add( to - 1 )
+
+    #sets the cost in the routing table based on an event
+    def setCostFromEvent( self, to, via, cost ):
+        self.putCost( to, via, cost )
+
+    #sets cost in the routing table to given value
+    def setCost( self, to, via, cost ):
+        if to == self.router or via == self.router:
+            return False
+
+        #set if non-existent, a lower cost, or it is an override from previous
+        #node of least cost
+        existing = self.getCost( to, via )
+
+        if    existing is None \
+           or existing >= cost \
+           or self.via[to - 1] == via:
+            self.putCost( to, via, cost )
+            return True
+
+        return False
+
+    #sets the next hop for a given path
+    def setHop( self, to, via ):
+        if self.hops[to - 1] != via:
+            self.changedRows.add( to - 1 )
+
+        self.hops[to - 1] = via
+
+    #sets the coordinates of the least cost path in a row of the routing table
+    def setCoordinate( self, index1, index2 ):
+        self.via[index1 - 1] = index2
+        self.changedRows.add( index1 - 1 )
+
+    #updates all coordinates for least cost paths in each row of the routing
+    #table, or only in the given rows (0-based) when the others are unchanged.
+    #Ties go to the lowest via router, as in the dense table.
+    def updateCoordinates( self, rows=None ):
+        ret = False
+
+        for c in ( range( 0, len( self.via ) ) if rows is None else rows ):
+            row = self.table.get( c )
+
+            if not row or not any( row.values() ):
+                if self.via[c] != 0:
+                    self.changedRows.add( c )
+
+                self.via[c]  = 0
+                self.hops[c] = 0
+                continue
+
+            cost, col = min( ( cost, via ) for via, cost in row.items() )
+            self.setHop( c + 1, col )
+
+            if self.via[c] != col:
+                self.via[c] = col
+                self.changedRows.add( c )
+                ret = True
+
+        return ret
+
+    #returns the distance vector this router currently advertises: for each
+    #destination, a ( cost, hops ) pair of its least cost path, or None
+    def distanceVector( self ):
+        vector = [ None for i in range( len( self.via ) ) ]
+
+        for c in range( 0, len( self.via ) ):
+            if self.via[c] != 0:
+                via       = self.via[c]
+                vector[c] = ( self.getCost( c + 1, via ), self.getNumHops( c + 1, via ) )
+
+        return vector
+
+    #clones this router
+    def clone( self ):
+        return deepcopy( self )
+
+    def __str__( self ):
+        rows = []
+
+        for c in range( 0, len( self.via ) ):
+            costs = [ self.getCost( c + 1, via + 1 ) for via in range( 0, len( self.via ) ) ]
+            rows.append( ', '.join( 'X' if cost is None else str( cost ) for cost in costs ) )
+
+        return '\n'.join( rows )
+
+"""
+Array-backed variant of RoutingTable for large networks, selected with the
+--numpy flag. Costs are kept in a float matrix with NaN for unknown entries
+(infinity is a real cost under poison reverse) and hop counts in an int matrix,
+so updateCoordinates picks every row's least cost path in one vectorized pass.
+It exposes the same methods as RoutingTable and requires numpy.
+"""
+class ArrayRoutingTable:
+    __slots__ = ( 'table', 'numHops', 'via', 'router', 'hops', 'changedRows' )
+
+    def __init__( self, numRouters, router ):
+        if numpy is None:
+            raise ImportError( 'ArrayRoutingTable requires numpy' )
+
+        self.table       = numpy.full( ( numRouters, numRouters ), numpy.nan )
+        self.numHops     = numpy.zeros( ( numRouters, numRouters ), dtype=numpy.int64 )
+        self.via         = numpy.zeros( numRouters, dtype=numpy.int64 )
+        self.router      = router
+        self.hops        = [ None for i in range( numRouters ) ]
+        self.changedRows = set()
+
+    #sets the number of hops it takes to get to a destination
+    def setNumHops( self, to, via, hops ):
+        self.numHops[to - 1, via - 1] = hops
+        self.changedRows.add( to - 1 )
+
+    #returns the number of hops to a destination
+    def getNumHops( self, to, via ):
+        return int( self.numHops[to - 1, via - 1] )
+
+    #returns the cost of a certain path in the routing table
+    def getCost( self, to, via ):
+        cost = self.table[to - 1, via - 1]
+        return None if cost != cost else float( cost )
+
+    #sets the cost in the routing table based on an event
+    def setCostFromEvent( self, to, via, cost ):
+        self.table[to - 1, via - 1] = numpy.nan if cost is None else cost
+        self.changedRows.add( to - 1 )
+
+    #sets cost in the routing table to given value
+    def setCost( self, to, via, cost ):
+        if to == self.router or via == self.router:
+            return False
+
+        current = self.table[to - 1, via - 1]
+
+        #set if non-existent, a lower cost, or it is an override from previous
+        #node of least cost
+        if    current != current \
+           or current >= cost \
+           or self.via[to - 1] == via:
+            self.table[to - 1, via - 1] = cost
+            self.changedRows.add( to - 1 )
+            return True
+
+        return False
+
+    #sets the next hop for a given path
+    def setHop( self, to, via ):
+        self.hops[to - 1] = via
+        self.changedRows.add( to - 1 )
+
+    #sets the coordinates of the least cost path in a row of the routing table
+    def setCoordinate( self, index1, index2 ):
+        self.via[index1 - 1] = index2
+        self.changedRows.add( index1 - 1 )
+
+    #updates all coordinates for least cost paths in each row of the routing
+    #table, or only in the given rows (0-based) when the others are unchanged
+    def updateCoordinates( self, rows=None ):
+        allRows = rows is None
+        rows    = numpy.arange( len( self.table ) ) if allRows else numpy.fromiter( rows, dtype=numpy.int64 )
+        table   = self.table[rows]
+        known   = ~numpy.isnan( table )
+        hasPath = ( known & ( table != 0 ) ).any( axis=1 )
+        costs   = numpy.where( known, table, numpy.inf )
+        col     = costs.argmin( axis=1 )
+
+        #rows whose known entries are all infinite take the first of them
+        allInf      = numpy.isinf( costs[numpy.arange( len( col ) ), col] )
+        col[allInf] = known[allInf].argmax( axis=1 )
+
+        via     = numpy.where( hasPath, col + 1, 0 )
+        changed = via != self.via[rows]
+
+        self.changedRows.update( rows[changed].tolist() )
+
+        self.via[rows] = via
+
+        if allRows:
+            self.hops = via.tolist()
+        else:
+            for c, v in zip( rows.tolist(), via.tolist() ):
+                self.hops[c] = v
+
+        return bool( ( changed & hasPath ).any() )
+
+    #returns the distance vector this router currently advertises: for each
+    #destination, a ( cost, hops ) pair of its least cost path, or None
+    def distanceVector( self ):
+        rows   = numpy.arange( len( self.via ) )
+        cols   = self.via - 1
+        costs  = self.table[rows, cols].tolist()
+        hops   = self.numHops[rows, cols].tolist()
+        vector = [ None for i in range( len( self.via ) ) ]
+
+        for c in numpy.flatnonzero( self.via ).tolist():
+            vector[c] = ( None if costs[c] != costs[c] else costs[c], hops[c] )
+
+        return vector
+
+    #clones this router
+    def clone( self ):
+        return deepcopy( self )
+
+    def __str__( self ):
+        tableStr = ''
+
+        for row in self.table.tolist():
+            tableStr += ', '.join( 'X' if x != x else str( x ) for x in row )
+            tableStr += '\n'
+
+        return tableStr.strip( ', \n' )
@@ -2,114 +2,152 @@
 """
 This file runs the simulation.
 """
-import math, re, sys
+import gzip, io, math, os, pickle, sys
+from concurrent.futures import ProcessPoolExecutor
 
-from event import Event, EventQueue
+from event import Event, EventQueue, EventStream
 from graph import Graph, Edge
-from router import RoutingTable
+from router import RoutingTable, SparseRoutingTable, ArrayRoutingTable, numpy
+from vectorized import VectorizedNetwork
+from incremental import IncrementalNetwork
+from profiler import Profiler, phase, write_trace
+from oracle import apply_events, shortest_path_table, verify_table
+from cache import DEFAULT_CACHE_BYTES, ResultCache, scenario_key
+from parsing import Topology, collection_paused, check_record, parse_topology, parse_events, stream_events
+from binary import TOPOLOGY_MAGIC, EVENT_MAGIC, is_binary, binary_to_topology, \
+                   binary_to_topological_events, binary_to_event_generator
 
 BASIC                        = 0
 SPLIT_HORIZON                = 1
 SPLIT_HORIZON_POISON_REVERSE = 2
+
+VARIANT_NAMES = {
+    BASIC                       : 'basic',
+    SPLIT_HORIZON               : 'split-horizon',
+    SPLIT_HORIZON_POISON_REVERSE: 'split-horizon-with-poison-reverse'
+}
+
+#the variants, engines and routing table classes the command line tools choose
+#from by name
+VARIANTS = { name: algoType for algoType, name in VARIANT_NAMES.items() }
+
+ENGINES = {
+    'loop'       : None,
+    'vectorized' : VectorizedNetwork,
+    'incremental': IncrementalNetwork
+}
+
+TABLES = {
+    'list'  : RoutingTable,
+    'sparse': SparseRoutingTable,
+    'numpy' : ArrayRoutingTable
+}
+
+OUTPUT_BUFFER_SIZE = 1 << 20
+
+#marks the state saved in a checkpoint, bumped whenever what is saved changes
+CHECKPOINT_FORMAT = 'dv-checkpoint-2'
+
+#command line options setting the StabilityLimits attributes
+LIMIT_OPTIONS = {
+    'max-hops'  : 'maxHops',
+    'max-cost'  : 'maxCost',
+    'max-rises' : 'maxRises',
+    'max-rounds': 'maxRounds'
+}
 """
-This turns a file into an undirected graph representation of the network
+This turns a file into a Topology, the router count and links of the network,
+from which each simulation builds its graph. The file may be in the text or the
+binary format.
 """
-def file_to_undirected_graph( filename ):
-    global num_routers, updates
-
-    handle      = open( filename, 'r' )
-    num_routers = int( handle.readline() )
-
-    topology = Graph()
+def file_to_topology( filename ):
+    if is_binary( filename, TOPOLOGY_MAGIC ):
+        return binary_to_topology( filename )
 
-    for line in handle:
-        match   = re.match( r'(\d+)\s+(\d+)\s+(\d+)', line )
-        router1 = int( match.group( 1 ) )
-        router2 = int( match.group( 2 ) )
-        cost    = int( match.group( 3 ) )
+    return parse_topology( filename )
 
-        edge = Edge( router1, router2, cost )
+"""
+This turns a file into an undirected graph representation of the network, with
+a routing table of the given class for every router. The file may be in the
+text or the binary format.
+"""
+def file_to_undirected_graph( filename, table_class=RoutingTable ):
+    return file_to_topology( filename ).toGraph( table_class )
 
-        if not topology.containsVertex( router1 ):
-            topology.addVertex( router1, RoutingTable( num_routers, router1 ) )
+"""
+This turns a file into an event queue, checking the routers against the number
+of routers if it is given. The file may be in the text or the binary format.
+"""
+def file_to_topological_events( filename, num_routers=None ):
+    if is_binary( filename, EVENT_MAGIC ):
+        return binary_to_topological_events( filename, num_routers )
 
-        if not topology.containsVertex( router2 ):
-            topology.addVertex( router2, RoutingTable( num_routers, router2 ) )
+    event_queue = EventQueue()
+    events      = parse_events( filename, num_routers )
 
-        topology.addEdge( edge )
-        updates[router1] = True
-        updates[router2] = True
+    with collection_paused():
+        event_queue.addEvents( events )
 
-    return topology
+    return event_queue
 
 """
-This turns a file into an event queue.
+This lazily reads events from a file already sorted by round number, yielding
+them one at a time.
 """
-def file_to_topological_events( filename ):
-    handle = open( filename, 'r' )
-
-    event_queue = EventQueue()
-
-    for line in handle:
-        match     = re.match( r'(\d+)\s+(\d+)\s+(\d+)\s+(-?\d+)', line )
-        round_num = int( match.group( 1 ) )
-        router1   = int( match.group( 2 ) )
-        router2   = int( match.group( 3 ) )
-        cost      = int( match.group( 4 ) )
+def file_to_event_generator( filename, num_routers=None ):
+    return stream_events( filename, num_routers )
 
-        to_add = Event( round_num, router1, router2, cost )
-        event_queue.addEvent( to_add )
+"""
+This turns a file already sorted by round number into a lazily read event
+stream. The file may be in the text or the binary format.
+"""
+def file_to_event_stream( filename, num_routers=None ):
+    if is_binary( filename, EVENT_MAGIC ):
+        return EventStream( binary_to_event_generator( filename, num_routers ) )
 
-    event_queue.prepare()
-    return event_queue
+    return EventStream( file_to_event_generator( filename, num_routers ) )
 
 """
 Usage definition
 """
 def usage():
-    print( 'Usage: ./simulator.py <topology file> <event file> <verbose value>' )
+    print( 'Usage: ./simulator.py [--numpy | --sparse] [--vectorized | --incremental] [--stream-events] [--gzip] [--verify | --converged] [--profile=<trace file>] [--max-hops=N] [--max-cost=N] [--max-rises=N] [--max-rounds=N] [--checkpoint=<prefix> [--checkpoint-round=N] | --cache=<directory> [--cache-size=MB]] <topology file> <event file> <verbose value>' )
+    print( '       ./simulator.py --resume=<prefix> [--vectorized | --incremental] [--stream-events] [--gzip] [--verify] [--profile=<trace file>] [--max-hops=N] [--max-cost=N] [--max-rises=N] [--max-rounds=N] [--checkpoint=<prefix> [--checkpoint-round=N]] <event file | -> <verbose value>' )
     exit( 0 )
 
+"""
+Returns the ( next hop, cost, hop count ) entry of a router's row of the table
+representation, for the given 0-based router and destination.
+"""
+def table_entry( routing_table, router, i ):
+    via = int( routing_table.via[i] )
+
+    if i == router:
+        return ( i + 1, 0, 0 )
+    elif via == 0:
+        return ( -1, -1, -1 )
+
+    return ( routing_table.hops[i], routing_table.getCost( i + 1, via ), routing_table.getNumHops( i + 1, via ) )
+
 """
 Translates network into a table representation for printing.
 """
 def tableize( network, on_round_0=False ):
-    global num_routers
-
+    num_routers = len( network.vertices )
     ret_table = [ [ None for i in range( num_routers ) ] for j in range( num_routers ) ]
 
     for router in range( 0, num_routers ):
         routing_table = network.vertices[router + 1]
 
-        for i in range( 0, len( routing_table.coordinates ) ):
-            if i == router:
-                next_hop  = i + 1
-                cost      = 0
-                hop_count = 0
-            elif routing_table.coordinates[i] is None:
-                next_hop  = -1
-                cost      = -1
-                hop_count = -1
-            else:
-                x, y      = routing_table.coordinates[i]
-                next_hop  = routing_table.hops[i]
-                cost      = routing_table.table[x - 1][y - 1]
-                hop_count = routing_table.numHops[x - 1][y - 1]
-
-            ret_table[router][i] = ( next_hop, cost, hop_count )
+        for i in range( 0, len( routing_table.via ) ):
+            ret_table[router][i] = table_entry( routing_table, router, i )
 
     return ret_table
 
 """
-Returns if the table has reached a count-to-infinity problem, based on hop count
+Hop count at which a table is considered to have a count-to-infinity problem
 """
-def is_count_to_infinity( table ):
-    for i in table:
-        for j in i:
-            if j[2] >= 100:
-                return True
-
-    return False
+COUNT_TO_INFINITY_HOPS = 100
 
 """
 This prints out the internal representation of each router (for debugging)
@@ -118,28 +156,25 @@ def print_network( network ):
     for vertex in network.vertices:
         print( 'Router ' + str( vertex ) + ':' )
         print( str( network.vertices[vertex] ) )
-        print( str( network.vertices[vertex].coordinates ) )
+        print( str( list( network.vertices[vertex].via ) ) )
         print( '\n' )
 
 """
-Prints a pretty representation of a given table.
+Prints a pretty representation of a given table. The rows are written to the
+given writer as they are formatted, or returned as a string if there is none.
 """
-def pretty_print( table ):
-    global num_routers
-
-    retval = ''
-
+def pretty_print( table, writer=None ):
     s = [ [ '{},{}'.format( e[0], e[2] ) for e in row ] for row in table ]
     # s.insert( 0, [ str( i ) for i in range( 1, num_routers + 1 ) ] )
 
     lens  = [ max( map( len, col ) ) for col in zip( *s ) ]
     fmt   = '    '.join( '{{:{}}}'.format( x ) for x in lens )
-    table = [ fmt.format( *row ) for row in s ]
+    lines = ( '{}  '.format( i + 1 ) + fmt.format( *row ) + '\n' for i, row in enumerate( s ) )
 
-    for i in range( 0, len( table ) ):
-        retval += '{}  '.format( i + 1 ) + table[i] + '\n'
+    if writer is None:
+        return ''.join( lines )
 
-    return retval
+    writer.writelines( lines )
 
 """
 Sets up the network with initial costs to neighboring nodes for each router.
@@ -155,19 +190,28 @@ def setup_network( network, verbose ):
             network.vertices[vertex].setNumHops( x, x, 1 )
 
 """
-Basic DVR algorithm
+Takes the round-start snapshot of the distance vector each router advertises.
 """
-def iter_basic( network ):
-    global updates
-
-    changed = False
-    cloned  = {}
+def snapshot_network( network ):
+    advertised = {}
 
-    #go through all nodes in the graph
     for vertex in network.vertices:
+        advertised[vertex] = network.vertices[vertex].distanceVector()
+
+    return advertised
+
+"""
+Basic DVR algorithm
+"""
+def iter_basic( network, updates, advertised=None, counters=None ):
+    changed  = False
+    messages = 0
+    calls    = 0
+    accepted = 0
 
-        #clone the node for sending
-        cloned[vertex] = network.vertices[vertex].clone()
+    #snapshot the distance vector of every node for sending
+    if advertised is None:
+        advertised = snapshot_network( network )
 
     #go through all nodes in the graph
     for vertex in network.vertices:
@@ -181,9 +225,10 @@ def iter_basic( network ):
 
         #go through the neighbor list
         for neighbor in vertex_neighbors.keys():
+            messages += 1
 
             #go through all table entries
-            for to in range( 0, len( network.vertices[vertex].table ) ):
+            for to in range( 0, len( network.vertices[vertex].via ) ):
                 to_router = to + 1
 
                 #skip ourselves
@@ -191,9 +236,8 @@ def iter_basic( network ):
                     continue
 
                 #send the current entry in the DV to the neighbor we are currently on, neighbor updates
-                if network.vertices[vertex].coordinates[to_router - 1] is not None:
-                    via = network.vertices[vertex].coordinates[to_router - 1][1]
-                    existing_cost = cloned[vertex].getCost( to_router, via )
+                if advertised[vertex][to] is not None:
+                    existing_cost, existing_hops = advertised[vertex][to]
 
                     #if it has existing cost we need to set
                     if existing_cost is not None:
@@ -203,10 +247,12 @@ def iter_basic( network ):
 
                         #this will tell us if we changed anything in the neighbor
                         didChange = network.vertices[neighbor].setCost( to_router, vertex, new_cost )
+                        calls    += 1
+                        accepted += didChange
 
                         #if we did change things, we need to set the update flags and numHops
                         if didChange:
-                            hop_count = 1 + cloned[vertex].getNumHops( to_router, via )
+                            hop_count = 1 + existing_hops
                             network.vertices[neighbor].setNumHops( to_router, vertex, hop_count )
                             updates[neighbor] = True
 
@@ -214,21 +260,25 @@ def iter_basic( network ):
                         if not changed and didChange:
                             changed = True
 
+    if counters is not None:
+        counters['messages']         += messages
+        counters['set_cost_calls']   += calls
+        counters['accepted_updates'] += accepted
+
     return changed
 
 """
 Split Horizon DVR algorithm
 """
-def iter_split_horizon( network ):
-    global updates
-
-    changed = False
-    cloned  = {}
+def iter_split_horizon( network, updates, advertised=None, counters=None ):
+    changed  = False
+    messages = 0
+    calls    = 0
+    accepted = 0
 
-    #go through all of the nodes in the network
-    for vertex in network.vertices:
-        #make a clone of it for sending
-        cloned[vertex] = network.vertices[vertex].clone()
+    #snapshot the distance vector of every node for sending
+    if advertised is None:
+        advertised = snapshot_network( network )
 
     #go through all of the nodes in the network
     for vertex in network.vertices:
@@ -242,9 +292,10 @@ def iter_split_horizon( network ):
 
         #go through all of the neighbors
         for neighbor in vertex_neighbors.keys():
+            messages += 1
 
             #got through entries in the routing table
-            for to in range( 0, len( network.vertices[vertex].table ) ):
+            for to in range( 0, len( network.vertices[vertex].via ) ):
                 to_router = to + 1
 
                 #skip ourselves
@@ -252,11 +303,10 @@ def iter_split_horizon( network ):
                     continue
 
                 #go through our least costs in DV
-                if network.vertices[vertex].coordinates[to_router - 1] is not None:
+                if advertised[vertex][to] is not None:
 
                     #calculate existing cost (on enighbor's side)
-                    via = network.vertices[vertex].coordinates[to_router - 1][1]
-                    existing_cost = cloned[vertex].getCost( to_router, via )
+                    existing_cost, existing_hops = advertised[vertex][to]
 
                     #if this cost is not None, we should update
                     if existing_cost is not None:
@@ -270,10 +320,12 @@ def iter_split_horizon( network ):
                             #calculate new costs, see if it changes from setCost
                             new_cost  = existing_cost + additional_cost
                             didChange = network.vertices[neighbor].setCost( to_router, vertex, new_cost )
+                            calls    += 1
+                            accepted += didChange
 
                             #if we changed we need to set hop count and updates
                             if didChange:
-                                hop_count = 1 + cloned[vertex].getNumHops( to_router, via )
+                                hop_count = 1 + existing_hops
                                 network.vertices[neighbor].setNumHops( to_router, vertex, hop_count )
                                 updates[neighbor] = True
 
@@ -281,20 +333,25 @@ def iter_split_horizon( network ):
                             if not changed and didChange:
                                 changed = True
 
+    if counters is not None:
+        counters['messages']         += messages
+        counters['set_cost_calls']   += calls
+        counters['accepted_updates'] += accepted
+
     return changed
 
 """
 Split Horizon with Posion Reverse DVR algorithm
 """
-def iter_split_horizon_poison_reverse( network ):
-    global updates
+def iter_split_horizon_poison_reverse( network, updates, advertised=None, counters=None ):
+    changed  = False
+    messages = 0
+    calls    = 0
+    accepted = 0
 
-    changed = False
-    cloned  = {}
-
-    #go through all nodes in the network, clone them for sending
-    for vertex in network.vertices:
-        cloned[vertex] = network.vertices[vertex].clone()
+    #snapshot the distance vector of every node for sending
+    if advertised is None:
+        advertised = snapshot_network( network )
 
     #go through all nodes in the network
     for vertex in network.vertices:
@@ -308,9 +365,10 @@ def iter_split_horizon_poison_reverse( network ):
 
         #go through all of the neighbors to send DV
         for neighbor in vertex_neighbors.keys():
+            messages += 1
 
             #go through our routing table
-            for to in range( 0, len( network.vertices[vertex].table ) ):
+            for to in range( 0, len( network.vertices[vertex].via ) ):
                 to_router = to + 1
 
                 #skip ourselves
@@ -318,11 +376,10 @@ def iter_split_horizon_poison_reverse( network ):
                     continue
 
                 #if we have a DV entry for this path, go in here
-                if network.vertices[vertex].coordinates[to_router - 1] is not None:
+                if advertised[vertex][to] is not None:
 
-                    #calculate the noe we go through and the existing cost
-                    via = network.vertices[vertex].coordinates[to_router - 1][1]
-                    existing_cost = cloned[vertex].getCost( to_router, via )
+                    #get the existing cost and hop count we advertise
+                    existing_cost, existing_hops = advertised[vertex][to]
 
                     #if the existing cost exists, go in here
                     if existing_cost is not None:
@@ -338,10 +395,12 @@ def iter_split_horizon_poison_reverse( network ):
 
                         #call setCost
                         didChange = network.vertices[neighbor].setCost( to_router, vertex, new_cost )
+                        calls    += 1
+                        accepted += didChange
 
                         #if we changed things, we need to update hop count and the updates list
                         if didChange:
-                            hop_count = 1 + cloned[vertex].getNumHops( to_router, via )
+                            hop_count = 1 + existing_hops
                             network.vertices[neighbor].setNumHops( to_router, vertex, hop_count )
                             updates[neighbor] = True
 
@@ -349,13 +408,18 @@ def iter_split_horizon_poison_reverse( network ):
                         if not changed and didChange:
                             changed =  True
 
+    if counters is not None:
+        counters['messages']         += messages
+        counters['set_cost_calls']   += calls
+        counters['accepted_updates'] += accepted
+
     return changed
 
 """
-Updates the network based on events.
+Updates the network based on events, flagging the affected routers for updates.
 """
-def update_network( network, events ):
-    global num_routers, updates
+def update_network( network, events, updates ):
+    num_routers = len( network.vertices )
 
     #updates the graph representation of the network
     network.updateGraph( events )
@@ -435,126 +499,877 @@ def update_network( network, events ):
                 updates[neighbor] = True
 
 """
-Runs a round of the current passed algorithm, and writes to file
+Kinds of instability a simulation can stop at
 """
-def dv_run( network, events, verbose, algoType ):
-    global updates
+HOP_LIMIT    = 'hop-limit'
+COST_LIMIT   = 'cost-limit'
+RISING_COST  = 'rising-cost'
+ROUND_BUDGET = 'round-budget'
 
-    changed         = True
-    round_num       = 2
-    last_event_time = 0
+"""
+The limits past which a simulation is considered unstable and stopped early:
+a hop count or least cost any router reaches for any destination, a number of
+times a least cost rises in a row without ever falling, and a number of rounds.
+Infinite costs, which poison reverse uses for unreachable destinations, never
+count against the cost limit. A limit of None is not checked. By default only
+the count-to-infinity hop count is.
+"""
+class StabilityLimits:
+    def __init__( self, maxHops=COUNT_TO_INFINITY_HOPS, maxCost=None, maxRises=None, maxRounds=None ):
+        self.maxHops   = maxHops
+        self.maxCost   = maxCost
+        self.maxRises  = maxRises
+        self.maxRounds = maxRounds
 
-    setup_network( network, verbose )
+    #returns if a ( next hop, cost, hop count ) table entry is past the hop
+    #count or cost limit
+    def exceeded( self, entry ):
+        if self.maxHops is not None and entry[2] >= self.maxHops:
+            return True
 
-    str_buf = ''
+        return self.maxCost is not None and self.maxCost <= entry[1] < math.inf
 
-    #verbose prints
-    if verbose:
-        str_buf += 'Round 1\n'
-        table = tableize( network, True )
-        str_buf += pretty_print( table )
+"""
+Describes the instability a simulation stopped at: its kind, the round it was
+found in, the router and destination it was found at, if any, and a message.
+"""
+class Instability:
+    def __init__( self, kind, roundNum, message, router=None, destination=None ):
+        self.kind        = kind
+        self.roundNum    = roundNum
+        self.message     = message
+        self.router      = router
+        self.destination = destination
+
+    def __str__( self ):
+        return self.message
+
+"""
+Holds the outcome of a simulation: the final table, the table after every
+round (verbose simulations only) and the convergence delay. A simulation that
+was stopped as unstable has its instability, and no convergence delay.
+"""
+class SimulationResult:
+    def __init__( self, algoType, table, rounds, convergenceDelay, instability=None ):
+        self.algoType         = algoType
+        self.table            = table
+        self.rounds           = rounds
+        self.convergenceDelay = convergenceDelay
+        self.instability      = instability
 
-    #main loop
-    while True:
-        round_events = events.getEvents( round_num )
+"""
+A simulation of one algorithm variant on a network. It owns the network, its
+event source and the routers' update flags, so any number of simulations can
+run side by side. Rounds run through the iter_* loops unless an engine class
+is given: VectorizedNetwork runs every round over the whole network at once
+and needs the network's routers to be ArrayRoutingTables, IncrementalNetwork
+only processes what changed since the previous round. Verbose simulations keep
+the table of every round in rounds, or write each round to output as it
+completes if an output handle is given. A simulation stops early, with its
+instability recorded, once it passes any of its StabilityLimits.
+"""
+class Simulation:
+    def __init__( self, network, events, algoType, verbose=False, engine=None, profiler=None, output=None, limits=None ):
+        self.setupState( network, events, algoType, verbose, profiler, output, limits )
+
+        setup_network( network, verbose )
+
+        if engine is not None:
+            self.engine = engine( network )
+
+        self.startTable( tableize( network, True ) )
+
+        for routing_table in network.vertices.values():
+            routing_table.changedRows.clear()
+
+    #sets up the state of a simulation that has not run a round yet, for every
+    #kind of simulation
+    def setupState( self, network, events, algoType, verbose, profiler, output, limits ):
+        self.network       = network
+        self.events        = events
+        self.algoType      = algoType
+        self.verbose       = verbose
+        self.profiler      = profiler
+        self.output        = output
+        self.limits        = limits if limits is not None else StabilityLimits()
+        self.instability   = None
+        self.rises         = {}
+        self.updates       = { vertex: True for vertex in network.vertices }
+        self.roundNum      = 2
+        self.lastEventTime = 0
+        self.rounds        = []
+        self.converged     = False
+        self.engine        = None
+
+    #starts the table the simulation keeps up to date from the rows routers
+    #changed, along with the number of entries past the hop count or cost
+    #limit, as the table of round 1
+    def startTable( self, table ):
+        self.table     = table
+        self.overLimit = sum( self.limits.exceeded( entry ) for row in table for entry in row )
+
+        if self.verbose:
+            self.recordRound( 1 )
+
+    #keeps the current table as that of the given round, or writes it out
+    def recordRound( self, roundNum ):
+        if self.output is not None:
+            write_round( self.output, roundNum, self.table )
+        else:
+            self.rounds.append( ( roundNum, [ row[:] for row in self.table ] ) )
+
+    #updates the table entries of the rows routers changed since the last
+    #update, and the number of times each least cost rose in a row. Poison
+    #reverse flips costs to infinity and back while counting to infinity, so
+    #a finite cost is compared with the last finite cost.
+    def refreshTable( self ):
+        for vertex, routing_table in self.network.vertices.items():
+            rows = routing_table.changedRows
+
+            if not rows:
+                continue
+
+            for i in rows:
+                self.setEntry( vertex, i, table_entry( routing_table, vertex - 1, i ) )
+
+            rows.clear()
+
+    #sets a router's table entry for a 0-based destination, keeping count of
+    #the entries past a limit and of the times the least cost rose in a row
+    def setEntry( self, vertex, i, entry ):
+        limits = self.limits
+        row    = self.table[vertex - 1]
+
+        self.overLimit += limits.exceeded( entry ) - limits.exceeded( row[i] )
+
+        if limits.maxRises is not None and entry[1] != row[i][1]:
+            if entry[0] == -1:
+                self.rises.pop( ( vertex, i ), None )
+            elif entry[1] < math.inf:
+                last, rises = self.rises.get( ( vertex, i ), ( entry[1], -1 ) )
+                self.rises[( vertex, i )] = ( entry[1], rises + 1 if entry[1] > last else 0 )
+
+        row[i] = entry
+
+    #returns the instability the simulation is in after the given round, if any
+    def findInstability( self, roundNum ):
+        limits = self.limits
+
+        #only looked for once an entry is known to be past a limit
+        if self.overLimit > 0:
+            for r, row in enumerate( self.table ):
+                for i, entry in enumerate( row ):
+                    if limits.maxHops is not None and entry[2] >= limits.maxHops:
+                        return Instability(
+                            HOP_LIMIT, roundNum,
+                            'Encountered a count-to-infinity instability: router {} reached a hop count of {} to router {} in round {}.'.format( r + 1, entry[2], i + 1, roundNum ),
+                            r + 1, i + 1
+                        )
+                    elif limits.exceeded( entry ):
+                        return Instability(
+                            COST_LIMIT, roundNum,
+                            'Encountered an instability: router {} reached a cost of {} to router {} in round {}.'.format( r + 1, entry[1], i + 1, roundNum ),
+                            r + 1, i + 1
+                        )
+
+        if limits.maxRises is not None:
+            for ( vertex, i ), ( last, rises ) in self.rises.items():
+                if rises >= limits.maxRises:
+                    return Instability(
+                        RISING_COST, roundNum,
+                        'Encountered a count-to-infinity instability: the cost of router {} to router {} rose {} times in a row, to {}, by round {}.'.format( vertex, i + 1, rises, last, roundNum ),
+                        vertex, i + 1
+                    )
+
+        if limits.maxRounds is not None and roundNum >= limits.maxRounds:
+            return Instability( ROUND_BUDGET, roundNum, 'Did not converge within {} rounds.'.format( limits.maxRounds ) )
+
+        return None
+
+    #runs a single round. Returns False once the network has converged and
+    #there are no events left, or the simulation was stopped as unstable.
+    def step( self ):
+        if self.converged or self.instability is not None:
+            return False
+
+        network  = self.network
+        profiler = self.profiler
+        counters = None
+
+        if profiler is not None:
+            profiler.startRound( self.roundNum )
+            counters = profiler.counters()
+
+        round_events = self.events.getEvents( self.roundNum )
 
         #perform updates from events this round
         if len( round_events ) > 0:
-            update_network( network, round_events )
-            last_event_time = round_num
+            with phase( profiler, 'events' ):
+                update_network( network, round_events, self.updates )
+
+                if self.engine is not None:
+                    self.engine.noteEvents( round_events )
+
+            self.lastEventTime = self.roundNum
+
+        #snapshot what every router advertises this round
+        with phase( profiler, 'snapshot' ):
+            if self.engine is not None:
+                self.engine.snapshot()
+            else:
+                advertised = snapshot_network( network )
 
         #run currrent algo
-        if algoType == BASIC:
-            changed = iter_basic( network )
-        elif algoType == SPLIT_HORIZON:
-            changed = iter_split_horizon( network )
-        elif algoType == SPLIT_HORIZON_POISON_REVERSE:
-            changed = iter_split_horizon_poison_reverse( network )
+        with phase( profiler, 'advertise' ):
+            if self.engine is not None:
+                changed = self.engine.iterate(
+                    self.updates,
+                    splitHorizon=self.algoType != BASIC,
+                    poisonReverse=self.algoType == SPLIT_HORIZON_POISON_REVERSE,
+                    counters=counters
+                )
+            elif self.algoType == BASIC:
+                changed = iter_basic( network, self.updates, advertised, counters )
+            elif self.algoType == SPLIT_HORIZON:
+                changed = iter_split_horizon( network, self.updates, advertised, counters )
+            elif self.algoType == SPLIT_HORIZON_POISON_REVERSE:
+                changed = iter_split_horizon_poison_reverse( network, self.updates, advertised, counters )
 
         #set updates (this is a failsafe)
-        for vertex in network.vertices:
-            updates[vertex] = network.vertices[vertex].updateCoordinates()
+        with phase( profiler, 'coordinates' ):
+            if self.engine is not None:
+                self.updates.update( self.engine.updateCoordinates() )
+            else:
+                for vertex in network.vertices:
+                    self.updates[vertex] = network.vertices[vertex].updateCoordinates()
+
+        if counters is not None:
+            counters['dirty_routers'] = sum( self.updates.values() )
+
+        return self.endRound( changed )
+
+    #finishes a round in which the routers' tables changed or not: stops if
+    #the network converged, otherwise brings the table up to date, records the
+    #round and looks for instabilities. Returns if the simulation goes on.
+    def endRound( self, changed ):
+        profiler = self.profiler
 
         #we're done
-        if not changed and not events.hasEvents():
-            break
+        if not changed and not self.events.hasEvents():
+            self.converged = True
+            return False
 
-        table = tableize( network )
+        with phase( profiler, 'tableize' ):
+            self.refreshTable()
 
         #verbose additions
-        if verbose:
-            str_buf += 'Round {}\n'.format( round_num )
-            str_buf += pretty_print( table )
-            #print( '\n' )
-            #print_network( network )
+        if self.verbose:
+            with phase( profiler, 'output' ):
+                self.recordRound( self.roundNum )
+
+        #chekc count to inifinity, and the other instabilities
+        self.instability = self.findInstability( self.roundNum )
+
+        if self.instability is not None:
+            return False
+
+        self.roundNum += 1
+        return True
+
+    #runs rounds until the network converges and returns the result. Given a
+    #checkpoint file, the state is saved to it once the given round is done,
+    #or when the simulation ends if no round is given or it ends first.
+    def run( self, checkpointFile=None, checkpointRound=None ):
+        saved = checkpointFile is None
+
+        while self.step():
+            if not saved and checkpointRound is not None and self.roundNum - 1 >= checkpointRound:
+                self.checkpoint( checkpointFile )
+                saved = True
+
+        if not saved:
+            self.checkpoint( checkpointFile )
+
+        return self.result()
+
+    #returns the result of the simulation so far
+    def result( self ):
+        self.refreshTable()
+
+        return SimulationResult(
+            self.algoType,
+            [ row[:] for row in self.table ],
+            self.rounds,
+            self.roundNum - 1 - self.lastEventTime if self.instability is None else None,
+            self.instability
+        )
+
+    #saves the state of the simulation between rounds to a gzip compressed
+    #pickle. Only plain data and the routing tables are saved, so that the
+    #checkpoint loads in any program, whatever module the simulation classes
+    #were defined in. The engine, profiler and output file are left out and set
+    #up again on resume. An event stream cannot be saved, so the rest of it is
+    #read into a queue first.
+    def checkpoint( self, filename ):
+        if isinstance( self.events, EventStream ):
+            queue = EventQueue()
+            queue.addEvents( self.events )
+            self.events = queue
+
+        network = self.network
+        state   = {
+            'format'       : CHECKPOINT_FORMAT,
+            'algoType'     : self.algoType,
+            'verbose'      : self.verbose,
+            'routers'      : list( network.vertices.items() ),
+            'links'        : [ ( edge.v1, edge.v2, edge.cost ) for edge in network.edges ],
+            'neighbors'    : [ ( vertex, list( neighbors.items() ) ) for vertex, neighbors in network.adjacency.items() ],
+            'events'       : [ ( e.roundNum, e.router1, e.router2, e.cost ) for e in self.events ],
+            'limits'       : vars( self.limits ).copy(),
+            'instability'  : vars( self.instability ).copy() if self.instability is not None else None,
+            'updates'      : self.updates,
+            'roundNum'     : self.roundNum,
+            'lastEventTime': self.lastEventTime,
+            'converged'    : self.converged,
+            'rises'        : self.rises,
+            'table'        : self.table,
+            'overLimit'    : self.overLimit,
+            'rounds'       : self.rounds
+        }
+
+        with gzip.open( filename, 'wb' ) as handle:
+            pickle.dump( state, handle, pickle.HIGHEST_PROTOCOL )
 
-        #chekc count to inifinity, output if so
-        if is_count_to_infinity( table ):
-            sys.exit( 'Encountered a count-to-infinity instability.' )
+"""
+Rebuilds a simulation from the state Simulation.checkpoint saved.
+"""
+def restore_simulation( state ):
+    network = Graph()
 
-        round_num += 1
+    for vertex, routing_table in state['routers']:
+        network.addVertex( vertex, routing_table )
 
-    #non verbose output
-    if not verbose:
-        table = tableize( network )
-        str_buf += pretty_print( table )
+    network.edges     = set( Edge( *link ) for link in state['links'] )
+    network.adjacency = { vertex: dict( neighbors ) for vertex, neighbors in state['neighbors'] }
 
-    final_convergence_delay = round_num - 1 - last_event_time
+    events = EventQueue()
+    events.addEvents( Event( *e ) for e in state['events'] )
 
-    #convergence delay output
-    str_buf += '\nConvergence Delay: {} round{}'.format( final_convergence_delay, 's' if final_convergence_delay != 1 else '' )
-    # print( str_buf )
+    simulation = Simulation.__new__( Simulation )
+    simulation.setupState( network, events, state['algoType'], state['verbose'], None, None, StabilityLimits( **state['limits'] ) )
+
+    if state['instability'] is not None:
+        simulation.instability = Instability( **state['instability'] )
+
+    for name in ( 'updates', 'roundNum', 'lastEventTime', 'converged', 'rises', 'table', 'overLimit', 'rounds' ):
+        setattr( simulation, name, state[name] )
+
+    return simulation
+
+"""
+Checks that an event only names routers of a network of the given number of
+routers, raising an error naming the given file and the event's round.
+"""
+def check_in_network( filename, event, num_routers ):
+    check_record( '{}: event for round {}'.format( filename, event.roundNum ), num_routers, event.router1, event.router2, event.cost, False )
+
+"""
+Yields the events of an iterable as they are checked by check_in_network.
+"""
+def events_in_network( filename, events, num_routers ):
+    for event in events:
+        check_in_network( filename, event, num_routers )
+        yield event
+
+"""
+Loads a simulation saved by Simulation.checkpoint, to carry on from the round
+after the checkpoint. Given events replace the events pending at the
+checkpoint, so many scenarios can fork from one converged baseline; they must
+not start before the round the simulation carries on from, and must only name
+the checkpointed network's routers. A queue is checked at once and a stream as
+it is read. The engine,
+profiler and output file are set up afresh, and the stability limits and
+verbosity are kept from the checkpoint unless given. Only load checkpoints you
+wrote, as they are pickles.
+"""
+def resume_simulation( filename, events=None, engine=None, profiler=None, output=None, limits=None, verbose=None ):
+    try:
+        with gzip.open( filename, 'rb' ) as handle:
+            state = pickle.load( handle )
+    except ( EOFError, OSError, pickle.UnpicklingError, AttributeError, ImportError ):
+        state = None
+
+    if not isinstance( state, dict ) or state.get( 'format' ) != CHECKPOINT_FORMAT:
+        raise ValueError( '{}: not a simulation checkpoint'.format( filename ) )
+
+    simulation = restore_simulation( state )
+
+    if events is not None:
+        if events.hasEvents() and events.nextRound() < simulation.roundNum:
+            raise ValueError( '{}: the simulation carries on from round {}, but the events start at round {}'.format(
+                filename, simulation.roundNum, events.nextRound()
+            ) )
+
+        num_routers = len( simulation.network.vertices )
+
+        if isinstance( events, EventQueue ):
+            for event in events:
+                check_in_network( filename, event, num_routers )
+        else:
+            events = EventStream( events_in_network( filename, events, num_routers ) )
+
+        simulation.events    = events
+        simulation.converged = False
+
+    if limits is not None:
+        simulation.limits    = limits
+        simulation.overLimit = sum( limits.exceeded( entry ) for row in simulation.table for entry in row )
+
+    if verbose is not None:
+        simulation.verbose = verbose
 
-    outfile_name = 'output-'
+    if engine is not None:
+        simulation.engine = engine( simulation.network )
 
-    if algoType == BASIC:
-        outfile_name += 'basic'
-    elif algoType == SPLIT_HORIZON:
-        outfile_name += 'split-horizon'
-    elif algoType == SPLIT_HORIZON_POISON_REVERSE:
-        outfile_name += 'split-horizon-with-poison-reverse'
+    simulation.profiler = profiler
+    simulation.output   = output
+
+    return simulation
+
+"""
+Writes the table of one round of a verbose simulation.
+"""
+def write_round( writer, round_num, table ):
+    writer.write( 'Round {}\n'.format( round_num ) )
+    pretty_print( table, writer )
+
+"""
+Writes the rest of a simulation result's output file: the rounds it kept if
+verbose, or only the final table if not, followed by the convergence delay.
+"""
+def write_result( writer, result, verbose ):
+    #verbose prints every round, non verbose only the final table
+    if verbose:
+        for round_num, table in result.rounds:
+            write_round( writer, round_num, table )
+    else:
+        pretty_print( result.table, writer )
+
+    #convergence delay output
+    writer.write( '\nConvergence Delay: {} round{}'.format( result.convergenceDelay, 's' if result.convergenceDelay != 1 else '' ) )
+
+"""
+Returns the name of the output file for an algorithm variant.
+"""
+def output_filename( algoType, verbose, compress=False ):
+    outfile_name = 'output-' + VARIANT_NAMES[algoType]
 
     if verbose:
         outfile_name += '-detailed'
 
-    outfile_name += '.txt'
+    return outfile_name + ( '.txt.gz' if compress else '.txt' )
+
+"""
+Opens an output file for writing through a large buffer, gzip compressed if
+the file name ends in .gz.
+"""
+def open_output( filename ):
+    if filename.endswith( '.gz' ):
+        return io.TextIOWrapper( io.BufferedWriter( gzip.open( filename, 'wb' ), OUTPUT_BUFFER_SIZE ) )
+
+    return open( filename, 'w', buffering=OUTPUT_BUFFER_SIZE )
+
+"""
+Reads back an output file, gzip compressed if the file name ends in .gz.
+"""
+def read_output( filename ):
+    if filename.endswith( '.gz' ):
+        with gzip.open( filename, 'rt' ) as handle:
+            return handle.read()
+
+    with open( filename, 'r' ) as handle:
+        return handle.read()
+
+"""
+Runs an algorithm variant to convergence and writes its output to the given
+file. Verbose rounds are written out as they complete, so memory does not grow
+with the number of rounds. A simulation stopped as unstable, or that fails,
+leaves no output file behind. Rounds and output are timed with the given
+profiler, if any. Given a ( file, round ) checkpoint, the simulation's state is
+saved as it passes that round, and given a checkpoint file to resume from, the
+simulation carries on from it with the given events instead of starting from
+the network. Returns the simulation and its result.
+"""
+def run_to_file( filename, network, events, verbose, algoType, engine=None, profiler=None, limits=None, checkpoint=None, resume=None ):
+    #a checkpoint is loaded before the output is opened, so that one that
+    #fails to load leaves no empty output behind
+    if resume is not None:
+        simulation = resume_simulation( resume, events, engine, profiler, None, limits, verbose )
+
+    outfile = open_output( filename )
+    output  = outfile if verbose else None
+
+    #a run that fails, such as on a malformed event in a stream, leaves no
+    #output behind either
+    try:
+        if resume is not None:
+            simulation.output = output
+        else:
+            simulation = Simulation( network, events, algoType, verbose, engine, profiler, output, limits )
+
+        result = simulation.run( *checkpoint ) if checkpoint is not None else simulation.run()
+    except Exception:
+        outfile.close()
+        os.remove( filename )
+        raise
+
+    finish_output( filename, outfile, result, verbose, profiler )
+    return simulation, result
+
+"""
+Finishes the output file of a simulation: writes the rest of its result, or
+closes and removes the file if the simulation was stopped as unstable. Output
+is timed with the given profiler, if any.
+"""
+def finish_output( filename, outfile, result, verbose, profiler=None ):
+    if result.instability is not None:
+        outfile.close()
+        os.remove( filename )
+        return
+
+    #the rest of the output is timed as a round of its own
+    if profiler is not None:
+        profiler.startRound( 'output' )
 
     #write file
-    outfile = open( outfile_name, 'w' )
-    outfile.write( str_buf )
-    outfile.close
+    with phase( profiler, 'output' ):
+        with outfile:
+            write_result( outfile, result, verbose )
+
+"""
+Runs an algorithm variant to its output file as run_to_file does, unless the
+cache holds the result of the same inputs under the given key, in which case
+the cached output is written without simulating. Returns the cache entry,
+holding the output, final table, instability, convergence delay and rounds
+run, and if it was a hit. Entries only hold plain data, so that any program
+can load them; the instability is rebuilt with entry_instability.
+"""
+def cached_run_to_file( cache, key, filename, network, events, verbose, algoType, engine=None, profiler=None, limits=None ):
+    entry = cache.get( key )
+
+    if entry is not None:
+        if entry['output'] is not None:
+            with open_output( filename ) as outfile:
+                outfile.write( entry['output'] )
+
+        return entry, True
+
+    simulation, result = run_to_file( filename, network, events, verbose, algoType, engine, profiler, limits )
+    entry              = {
+        'output'          : read_output( filename ) if result.instability is None else None,
+        'table'           : result.table,
+        'instability'     : vars( result.instability ).copy() if result.instability is not None else None,
+        'convergenceDelay': result.convergenceDelay,
+        'rounds'          : result.instability.roundNum if result.instability is not None else simulation.roundNum - 1
+    }
+
+    cache.put( key, entry )
+    return entry, False
+
+"""
+Returns the instability of a cache entry, or None if it had none.
+"""
+def entry_instability( entry ):
+    return Instability( **entry['instability'] ) if entry['instability'] is not None else None
+
+"""
+Runs the current passed algorithm to convergence, and writes to file. Returns
+the result, whose instability is set if the simulation was stopped as unstable.
+"""
+def dv_run( network, events, verbose, algoType, engine=None, profiler=None, compress=False, limits=None ):
+    simulation, result = run_to_file( output_filename( algoType, verbose, compress ), network, events, verbose, algoType, engine, profiler, limits )
+    return result
+
+"""
+Returns the name of the checkpoint file of an algorithm variant.
+"""
+def checkpoint_filename( prefix, algoType ):
+    return '{}-{}.ckpt'.format( prefix, VARIANT_NAMES[algoType] )
+
+"""
+Runs one algorithm variant on its own copy of the parsed inputs, as the entry
+point of each worker process. A streamed event file is passed by name and
+opened here, since an event stream cannot be shared between processes. When
+resuming, the variant carries on from its checkpoint under the given prefix,
+with the given events unless they are None. Otherwise the network is given as
+a Topology, and its routing tables, of the given class, are only allocated
+here, and the routers of streamed events are checked against its router count.
+Given a ResultCache, a variant run before on the same inputs is not simulated
+again. Returns the variant's instability, if any, the outcome of verify_table
+on its final table and the final network when verifying, and the recorded
+rounds when profiling.
+"""
+def run_variant( topology, events, verbose, algoType, engine, profile=False, compress=False, limits=None, verify=False, checkpoint=None, checkpointRound=None, resume=None, cache=None, table_class=RoutingTable ):
+    profiler    = Profiler( VARIANT_NAMES[algoType] ) if profile else None
+    differences = None
+    num_routers = None
+
+    if isinstance( topology, Topology ):
+        num_routers = topology.numRouters
+        topology    = topology.toGraph( table_class )
+
+    if cache is not None:
+        return run_cached_variant( cache, topology, events, verbose, algoType, engine, profiler, compress, limits if limits is not None else StabilityLimits(), verify, num_routers )
+
+    if isinstance( events, str ):
+        events = file_to_event_stream( events, num_routers )
+
+    if checkpoint is not None:
+        checkpoint = ( checkpoint_filename( checkpoint, algoType ), checkpointRound )
+
+    if resume is not None:
+        resume = checkpoint_filename( resume, algoType )
+
+    simulation, result = run_to_file(
+        output_filename( algoType, verbose, compress ), topology, events, verbose, algoType,
+        engine, profiler, limits, checkpoint, resume
+    )
+
+    if verify and result.instability is None:
+        differences = verify_table( simulation.network, result.table )
+
+    return result.instability, differences, profiler.rounds if profiler is not None else None
+
+"""
+Runs one algorithm variant through a ResultCache, for run_variant. A streamed
+event file is read through once for the key and opened again to simulate or
+verify.
+"""
+def run_cached_variant( cache, topology, events, verbose, algoType, engine, profiler, compress, limits, verify, num_routers=None ):
+    source      = events
+    differences = None
+
+    if isinstance( source, str ):
+        events = file_to_event_stream( source, num_routers )
+
+    key          = scenario_key( topology, events, algoType, verbose, limits )
+    events       = file_to_event_stream( source, num_routers ) if isinstance( source, str ) else events
+    entry, found = cached_run_to_file( cache, key, output_filename( algoType, verbose, compress ), topology, events, verbose, algoType, engine, profiler, limits )
+
+    if verify and entry['instability'] is None:
+        #a hit leaves the network as it was before the events
+        if found:
+            apply_events( topology, file_to_event_stream( source, num_routers ) if isinstance( source, str ) else events )
+
+        differences = verify_table( topology, entry['table'] )
+
+    return entry_instability( entry ), differences, profiler.rounds if profiler is not None else None
+
+"""
+Writes the output of every variant the cache holds a result for, so that only
+the others need simulating. The network is built without routing tables, as it
+is only needed for the keys and verifying. Returns the outcome of each variant
+served, as run_variant would, by variant.
+"""
+def serve_from_cache( cache, topology, events, verbose, algoTypes, profile=False, compress=False, limits=None, verify=False ):
+    network  = topology.toGraph()
+    streamed = lambda: file_to_event_stream( events, topology.numRouters ) if isinstance( events, str ) else events
+    limits   = limits if limits is not None else StabilityLimits()
+    final    = None
+    outcomes = {}
+
+    for algoType in algoTypes:
+        key   = scenario_key( network, streamed(), algoType, verbose, limits )
+        entry = cache.get( key )
+
+        if entry is None:
+            continue
+
+        if entry['output'] is not None:
+            with open_output( output_filename( algoType, verbose, compress ) ) as outfile:
+                outfile.write( entry['output'] )
+
+        differences = None
+
+        #the final network is only worked out once, and leaves a queue as it was
+        if verify and entry['instability'] is None:
+            if final is None:
+                network.updateGraph( list( streamed() ) )
+                final = shortest_path_table( network )
+
+            differences = verify_table( network, entry['table'], final )
+
+        outcomes[algoType] = ( entry_instability( entry ), differences, [] if profile else None )
+
+    return outcomes
+
+"""
+Skips the simulation and writes the least cost table of the network once every
+event has happened, computed straight from the final graph, to
+output-converged.txt. This is the table ideal distance vector routing converges
+to, which the simulation's own can differ from.
+"""
+def converged_run( network, events, compress=False ):
+    apply_events( network, events )
+
+    with open_output( 'output-converged.txt' + ( '.gz' if compress else '' ) ) as outfile:
+        pretty_print( shortest_path_table( network ), outfile )
 
 """
 Main function, runs on command line call.
 """
 def main( argv ):
-    global updates
-
-    if len( argv ) != 3:
+    flags   = [ arg for arg in argv if arg.startswith( '--' ) and '=' not in arg ]
+    options = [ arg[2:].split( '=', 1 ) for arg in argv if arg.startswith( '--' ) and '=' in arg ]
+    argv    = [ arg for arg in argv if not arg.startswith( '--' ) ]
+    names   = [ name for name, value in options ]
+    resume  = 'resume' in names
+
+    if    len( argv ) != ( 2 if resume else 3 ) \
+       or any( flag not in ( '--numpy', '--sparse', '--vectorized', '--incremental', '--stream-events', '--gzip', '--verify', '--converged' ) for flag in flags ) \
+       or ( '--vectorized' in flags and '--incremental' in flags ) \
+       or ( '--sparse' in flags and ( '--numpy' in flags or '--vectorized' in flags ) ) \
+       or ( resume and any( flag in ( '--numpy', '--sparse', '--converged' ) for flag in flags ) ) \
+       or ( 'checkpoint-round' in names and 'checkpoint' not in names ) \
+       or ( 'cache-size' in names and 'cache' not in names ) \
+       or ( 'cache' in names and ( resume or 'checkpoint' in names or '--converged' in flags ) ) \
+       or any( name not in ( 'profile', 'checkpoint', 'checkpoint-round', 'resume', 'cache', 'cache-size' ) and name not in LIMIT_OPTIONS for name in names ) \
+       or len( set( names ) ) != len( names ) \
+       or any( not value.isdigit() for name, value in options if name in LIMIT_OPTIONS or name in ( 'checkpoint-round', 'cache-size' ) ):
         usage()
 
+    if numpy is None and ( '--numpy' in flags or '--vectorized' in flags ):
+        sys.exit( '--numpy and --vectorized need numpy, which is not installed' )
+
+    options = dict( options )
+    profile = options.get( 'profile' )
+    limits  = StabilityLimits()
+
+    for name, attribute in LIMIT_OPTIONS.items():
+        if name in options:
+            setattr( limits, attribute, int( options[name] ) )
+
+    #a resumed simulation keeps the limits it was checkpointed with unless
+    #others are given
+    if resume and not any( name in options for name in LIMIT_OPTIONS ):
+        limits = None
+
+    if resume:
+        argv = [ None ] + argv
+
     topology_filename           = argv[0]
     topological_events_filename = argv[1]
     verbose                     = int( argv[2] ) == 1
+    vectorized                  = '--vectorized' in flags
+    table_class                 = ArrayRoutingTable if '--numpy' in flags or vectorized else RoutingTable
+    engine                      = None
+    checkpoint                  = options.get( 'checkpoint' )
+    checkpoint_round            = int( options['checkpoint-round'] ) if 'checkpoint-round' in options else None
+    variants                    = [ BASIC, SPLIT_HORIZON, SPLIT_HORIZON_POISON_REVERSE ]
+    cache                       = None
+
+    if 'cache' in options:
+        cache = ResultCache( options['cache'], int( options['cache-size'] ) << 20 if 'cache-size' in options else DEFAULT_CACHE_BYTES )
+
+    if '--sparse' in flags:
+        table_class = SparseRoutingTable
+
+    if vectorized:
+        engine = VectorizedNetwork
+    elif '--incremental' in flags:
+        engine = IncrementalNetwork
+
+    #parse the inputs once, each worker gets its own copy and allocates its
+    #own routing tables. A resumed simulation brings its own network, and -
+    #keeps its pending events.
+    topology    = None
+    num_routers = None
+
+    try:
+        if not resume:
+            topology    = file_to_topology( topology_filename )
+            num_routers = topology.numRouters
+
+        if resume and topological_events_filename == '-':
+            topological_events = None
+        elif '--stream-events' in flags:
+            topological_events = topological_events_filename
+        else:
+            topological_events = file_to_topological_events( topological_events_filename, num_routers )
+    except ValueError as error:
+        sys.exit( str( error ) )
+
+    if resume:
+        variants = [ algoType for algoType in variants if os.path.isfile( checkpoint_filename( options['resume'], algoType ) ) ]
+
+        if not variants:
+            sys.exit( 'No checkpoints found with the prefix {}'.format( options['resume'] ) )
+
+    #a streamed event file is only checked as it is read, so its errors can
+    #come from any of the runs
+    try:
+        if '--converged' in flags:
+            if isinstance( topological_events, str ):
+                topological_events = file_to_event_stream( topological_events, num_routers )
+
+            converged_run( topology.toGraph(), topological_events, '--gzip' in flags )
+            return
+
+        #variants the cache holds are written out first, and only the rest are
+        #simulated
+        served = {}
+
+        if cache is not None:
+            served = serve_from_cache( cache, topology, topological_events, verbose, variants, profile is not None, '--gzip' in flags, limits, '--verify' in flags )
+
+        #runs the basic, split-horizon and split-horizon with poison reverse DVR
+        #algorithms in parallel
+        with ProcessPoolExecutor( max_workers=3 ) as pool:
+            futures = {
+                algoType: pool.submit(
+                    run_variant, topology, topological_events, verbose, algoType, engine, profile is not None, '--gzip' in flags, limits,
+                    '--verify' in flags, checkpoint, checkpoint_round, options.get( 'resume' ), cache, table_class
+                )
+                for algoType in variants if algoType not in served
+            }
+
+            outcomes = [ served[algoType] if algoType in served else futures[algoType].result() for algoType in variants ]
+    except ValueError as error:
+        sys.exit( str( error ) )
+
+    #one trace covering every variant
+    if profile is not None:
+        write_trace( profile, [ row for instability, checks, trace in outcomes for row in trace ] )
+
+    #the variants that were stopped as unstable, or whose tables break what the
+    #simulation guarantees, are reported once all have run. Entries that are
+    #not least cost paths are expected of the simulation, so are only noted.
+    problems = []
+
+    for algoType, ( instability, checks, trace ) in zip( variants, outcomes ):
+        if instability is not None:
+            problems.append( '{}: {}'.format( VARIANT_NAMES[algoType], instability ) )
+
+        if checks is None:
+            continue
 
-    updates = {}
+        violations, differences = checks
 
-    #runs the basic DVR algorithm
-    topology           = file_to_undirected_graph( topology_filename )
-    topological_events = file_to_topological_events( topological_events_filename )
-    dv_run( topology, topological_events, verbose, BASIC )
+        if violations:
+            router, destination, entry, problem = violations[0]
+            problems.append( '{}: {} table entries are invalid, first router {} to router {}: {} {}'.format(
+                VARIANT_NAMES[algoType], len( violations ), router, destination, entry, problem
+            ) )
 
-    #runs the split-horizon DVR algorithm
-    topology           = file_to_undirected_graph( topology_filename )
-    topological_events = file_to_topological_events( topological_events_filename )
-    dv_run( topology, topological_events, verbose, SPLIT_HORIZON )
+        if differences:
+            router, destination, expected, actual = differences[0]
+            print( '{}: {} table entries are not least cost paths, first router {} to router {}: least cost {}, got {}'.format(
+                VARIANT_NAMES[algoType], len( differences ), router, destination, expected, actual
+            ) )
 
-    #runs the split-horizon with posion reverse DVR algorithm
-    topology           = file_to_undirected_graph( topology_filename )
-    topological_events = file_to_topological_events( topological_events_filename )
-    dv_run( topology, topological_events, verbose, SPLIT_HORIZON_POISON_REVERSE )
+    if problems:
+        sys.exit( '\n'.join( problems ) )
 
 if __name__ == "__main__":
     main( sys.argv[1:] )
-
-sys.exit( 0 )
+    sys.exit( 0 )
@@ -0,0 +1,176 @@
+#!/usr/bin/python3
+"""
+This file runs a link failure what-if sweep. Each selected variant converges
+once from the topology and an optional file of baseline events, and its
+converged state is saved as a checkpoint in the output directory. Then, for
+every link of the converged network, a fork of that state has the link removed
+in the round it carries on from and runs to convergence again. The forks run
+across a pool of worker processes. None of them simulates the initial
+convergence again.
+
+A report of every link and variant is written as CSV and printed. It gives the
+status, the convergence delay after the failure, the rounds run, and the
+number of table entries that changed or became unreachable. With --tables, the
+final table of every fork is written as well.
+"""
+import argparse, csv, os, sys, time
+from concurrent.futures import ProcessPoolExecutor
+
+from batch import print_summary
+from event import Event, EventQueue
+from router import numpy
+from simulator import VARIANTS, ENGINES, TABLES, StabilityLimits, Simulation, resume_simulation, checkpoint_filename, \
+                      file_to_undirected_graph, file_to_topological_events, open_output, pretty_print
+
+FIELDS = [ 'link', 'cost', 'variant', 'status', 'convergence_delay', 'rounds', 'changed_entries', 'unreachable_entries', 'wall_seconds', 'instability' ]
+
+"""
+Fills in a report row from a simulation's result, counting the entries of its
+final table that differ from the given table and those that are unreachable.
+"""
+def fill_row( row, simulation, result, first_round, baseline=None ):
+    if result.instability is not None:
+        row['status']      = result.instability.kind
+        row['rounds']      = result.instability.roundNum - first_round + 1
+        row['instability'] = str( result.instability )
+        return
+
+    row['convergence_delay']   = result.convergenceDelay
+    row['rounds']              = simulation.roundNum - first_round
+    row['unreachable_entries'] = sum( entry[0] == -1 for table_row in result.table for entry in table_row )
+
+    if baseline is not None:
+        row['changed_entries'] = sum(
+            entry != baseline_entry
+            for table_row, baseline_row in zip( result.table, baseline )
+            for entry, baseline_entry in zip( table_row, baseline_row )
+        )
+
+"""
+Converges one variant from the topology and the baseline events, if any, and
+saves its converged state to a checkpoint file. This runs in a worker process.
+Returns the baseline's report row, the round the forks carry on from, and the
+links of the converged network as ( router1, router2, cost ), lowest label
+first, or no links if the baseline was unstable.
+"""
+def run_baseline( topology_filename, event_filename, variant, table, engine, limits, checkpoint ):
+    start      = time.perf_counter()
+    network    = file_to_undirected_graph( topology_filename, TABLES[table] )
+    events     = file_to_topological_events( event_filename, len( network.vertices ) ) if event_filename is not None else EventQueue()
+    simulation = Simulation( network, events, VARIANTS[variant], engine=ENGINES[engine], limits=limits )
+    result     = simulation.run( checkpoint )
+    row        = { 'link': 'baseline', 'variant': variant, 'status': 'ok', 'wall_seconds': round( time.perf_counter() - start, 6 ) }
+
+    fill_row( row, simulation, result, 2 )
+
+    if result.instability is not None:
+        return row, None, []
+
+    links = sorted(
+        ( min( edge.v1, edge.v2 ), max( edge.v1, edge.v2 ), network.getEdgeCost( edge.v1, edge.v2 ) )
+        for edge in network.edges if edge.v1 != edge.v2
+    )
+
+    return row, simulation.roundNum, links
+
+"""
+Forks a variant's converged state, removes one link in the round the fork
+carries on from, and runs it to convergence. This runs in a worker process.
+Writes the final table to the tables directory, if any, and returns the link's
+report row; errors are recorded in the row rather than stopping the sweep.
+"""
+def run_fork( checkpoint, round_num, link, variant, engine, limits, tables_directory=None ):
+    router1, router2, cost = link
+    row                    = { 'link': '{}-{}'.format( router1, router2 ), 'cost': cost, 'variant': variant, 'status': 'ok' }
+
+    try:
+        start  = time.perf_counter()
+        events = EventQueue()
+        events.addEvent( Event( round_num, router1, router2, -1 ) )
+
+        simulation = resume_simulation( checkpoint, events, ENGINES[engine], limits=limits )
+        baseline   = [ table_row[:] for table_row in simulation.table ]
+        result     = simulation.run()
+
+        row['wall_seconds'] = round( time.perf_counter() - start, 6 )
+        fill_row( row, simulation, result, round_num, baseline )
+
+        if tables_directory is not None and result.instability is None:
+            directory = os.path.join( tables_directory, '{}-{}'.format( router1, router2 ) )
+            os.makedirs( directory, exist_ok=True )
+
+            with open_output( os.path.join( directory, 'output-{}.txt'.format( variant ) ) ) as outfile:
+                pretty_print( result.table, outfile )
+    except Exception as e:
+        row['status'] = 'error: {}'.format( e )
+
+    return row
+
+"""
+Main function, runs on command line call.
+"""
+def main( argv=None ):
+    parser = argparse.ArgumentParser( description='Fail every link of a converged network in turn and report how each variant reconverges.' )
+    parser.add_argument( 'topology' )
+    parser.add_argument( '--events', help='events to run before the baseline is taken' )
+    parser.add_argument( '--output', default='sweep-output', help='directory to write the checkpoints and report to' )
+    parser.add_argument( '--variants', default=','.join( VARIANTS ) )
+    parser.add_argument( '--engine', default='loop', choices=ENGINES )
+    parser.add_argument( '--table', default='list', choices=TABLES )
+    parser.add_argument( '--tables', action='store_true', help='write the final table of every fork' )
+    parser.add_argument( '--workers', type=int, default=os.cpu_count() )
+    parser.add_argument( '--max-hops', type=int, default=StabilityLimits().maxHops, help='hop count at which a variant is stopped as unstable' )
+    parser.add_argument( '--max-cost', type=int, help='finite cost at which a variant is stopped as unstable' )
+    parser.add_argument( '--max-rises', type=int, help='times a least cost may rise in a row before a variant is stopped as unstable' )
+    parser.add_argument( '--max-rounds', type=int, help='rounds a variant may run without converging' )
+    args = parser.parse_args( argv )
+
+    if args.engine == 'vectorized' and args.table != 'numpy':
+        parser.error( 'the vectorized engine needs --table numpy' )
+
+    if args.table == 'numpy' and numpy is None:
+        parser.error( '--table numpy needs numpy, which is not installed' )
+
+    variants = args.variants.split( ',' )
+    limits   = StabilityLimits( args.max_hops, args.max_cost, args.max_rises, args.max_rounds )
+
+    for variant in variants:
+        if variant not in VARIANTS:
+            parser.error( 'unknown variant: {}'.format( variant ) )
+
+    os.makedirs( args.output, exist_ok=True )
+
+    tables_directory = os.path.join( args.output, 'tables' ) if args.tables else None
+    checkpoints      = { variant: checkpoint_filename( os.path.join( args.output, 'baseline' ), VARIANTS[variant] ) for variant in variants }
+
+    #a malformed input file stops the baselines, and so the whole sweep
+    try:
+        with ProcessPoolExecutor( max_workers=args.workers ) as pool:
+            baselines = [
+                pool.submit( run_baseline, args.topology, args.events, variant, args.table, args.engine, limits, checkpoints[variant] )
+                for variant in variants
+            ]
+
+            rows    = []
+            futures = []
+
+            for variant, baseline in zip( variants, baselines ):
+                row, round_num, links = baseline.result()
+                rows.append( row )
+
+                for link in links:
+                    futures.append( pool.submit( run_fork, checkpoints[variant], round_num, link, variant, args.engine, limits, tables_directory ) )
+
+            rows.extend( future.result() for future in futures )
+    except ValueError as error:
+        sys.exit( str( error ) )
+
+    with open( os.path.join( args.output, 'sweep.csv' ), 'w', newline='' ) as handle:
+        writer = csv.DictWriter( handle, fieldnames=FIELDS )
+        writer.writeheader()
+        writer.writerows( rows )
+
+    print_summary( rows, fields=FIELDS )
+
+if __name__ == "__main__":
+    main()
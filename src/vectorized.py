@@ -0,0 +1,165 @@
+"""
+Whole-network distance vector engine. Stacks every router's ArrayRoutingTable
+into N x N x N cost and hop tensors (router, destination, via) and runs each
+round of the three algorithm variants as batched array operations over the
+directed links of the network, giving the same tables round for round as the
+per-router iter_* loops in simulator.py.
+"""
+import math
+
+from router import ArrayRoutingTable, numpy
+
+class VectorizedNetwork:
+    #stacks the routing tables of a set up network, whose routers are labelled
+    #1..N, and rebinds every router to views of the stacked tensors so that
+    #event updates and table output keep working through the routers
+    def __init__( self, network ):
+        if numpy is None:
+            raise ImportError( 'VectorizedNetwork requires numpy' )
+
+        self.network    = network
+        self.numRouters = len( network.vertices )
+        self.routers    = [ network.vertices[r + 1] for r in range( self.numRouters ) ]
+
+        for router in self.routers:
+            if not isinstance( router, ArrayRoutingTable ):
+                raise TypeError( 'VectorizedNetwork requires ArrayRoutingTable routers' )
+
+        self.table   = numpy.stack( [ router.table for router in self.routers ] )
+        self.numHops = numpy.stack( [ router.numHops for router in self.routers ] )
+        self.via     = numpy.stack( [ router.via for router in self.routers ] )
+
+        for r, router in enumerate( self.routers ):
+            router.table   = self.table[r]
+            router.numHops = self.numHops[r]
+            router.via     = self.via[r]
+
+        #senders are processed in the graph's vertex order, as in the loops
+        self.order = numpy.zeros( self.numRouters, dtype=numpy.int64 )
+
+        for position, vertex in enumerate( network.vertices ):
+            self.order[vertex - 1] = position
+
+    #the engine reads the network's state afresh every round, so there is
+    #nothing to note about a round's events
+    def noteEvents( self, events ):
+        pass
+
+    #returns the directed links of the network as sender and receiver indices
+    def links( self ):
+        senders   = []
+        receivers = []
+
+        for vertex in self.network.vertices:
+            for neighbor in self.network.getNeighbors( vertex ):
+                if neighbor != vertex:
+                    senders.append( vertex - 1 )
+                    receivers.append( neighbor - 1 )
+
+        return numpy.array( senders, dtype=numpy.int64 ), numpy.array( receivers, dtype=numpy.int64 )
+
+    #takes the round-start snapshot of the advertised distance vectors. Must be
+    #called at the start of every round, before iterate.
+    def snapshot( self ):
+        rows = numpy.arange( self.numRouters )
+        cols = numpy.maximum( self.via - 1, 0 )
+
+        self.advCost   = numpy.take_along_axis( self.table, cols[:, :, None], axis=2 )[:, :, 0]
+        self.advHops   = numpy.take_along_axis( self.numHops, cols[:, :, None], axis=2 )[:, :, 0]
+        self.advertise = ( self.via > 0 ) & ~numpy.isnan( self.advCost )
+        self.advertise[rows, rows] = False
+
+    #runs one round of the basic algorithm, optionally with split horizon and
+    #poison reverse, setting update flags for routers whose tables changed.
+    #Work done is added to the given counters, if any. Returns if anything
+    #changed at all.
+    def iterate( self, updates, splitHorizon=False, poisonReverse=False, counters=None ):
+        rows               = numpy.arange( self.numRouters )
+        senders, receivers = self.links()
+        advCost            = self.advCost
+        advHops            = self.advHops
+
+        if len( senders ) == 0:
+            return False
+
+        #cost of every link as seen from the receiving side
+        linkCost  = self.table[receivers, senders, senders]
+        newCost   = advCost[senders] + linkCost[:, None]
+        reverse   = self.via[senders] == ( receivers + 1 )[:, None]
+        advertise = self.advertise[senders]
+
+        #paths through the receiver are poisoned or left out of the advertisement
+        if poisonReverse:
+            newCost = numpy.where( reverse, math.inf, newCost )
+        elif splitHorizon:
+            advertise &= ~reverse
+
+        #setCost on the receivers, one row per directed link
+        current = self.table[receivers[:, None], rows[None, :], senders[:, None]]
+        accept  = numpy.isnan( current ) \
+                | ( current >= newCost ) \
+                | ( self.via[receivers] == ( senders + 1 )[:, None] )
+        accept &= advertise
+        accept[rows[None, :] == receivers[:, None]] = False
+        linkChanged = accept.any( axis=1 )
+
+        #a router flagged by an earlier sender in the round sends this round too
+        sending = numpy.array( [ bool( updates[r + 1] ) for r in rows ] )
+
+        while True:
+            wakes = sending[senders] & linkChanged & ( self.order[senders] < self.order[receivers] )
+            woken = sending.copy()
+            woken[receivers[wakes]] = True
+
+            if ( woken == sending ).all():
+                break
+
+            sending = woken
+
+        #only links from routers that send carry a message
+        if counters is not None:
+            counters['messages']       += int( sending[senders].sum() )
+            counters['set_cost_calls'] += int( advertise[sending[senders]].sum() )
+
+        accept &= sending[senders][:, None]
+        link, to = numpy.nonzero( accept )
+
+        if counters is not None:
+            counters['accepted_updates'] += len( link )
+
+        self.table[receivers[link], to, senders[link]]   = newCost[link, to]
+        self.numHops[receivers[link], to, senders[link]] = 1 + advHops[senders[link], to]
+
+        for receiver, row in zip( receivers[link].tolist(), to.tolist() ):
+            self.routers[receiver].changedRows.add( row )
+
+        for receiver in numpy.unique( receivers[link] ).tolist():
+            updates[receiver + 1] = True
+
+        return len( link ) > 0
+
+    #updates the least cost coordinates of every router at once. Returns the
+    #update flag of every router, keyed by router label.
+    def updateCoordinates( self ):
+        known   = ~numpy.isnan( self.table )
+        hasPath = ( known & ( self.table != 0 ) ).any( axis=2 )
+        costs   = numpy.where( known, self.table, numpy.inf )
+        col     = costs.argmin( axis=2 )
+
+        #rows whose known entries are all infinite take the first of them
+        allInf      = numpy.isinf( numpy.take_along_axis( costs, col[:, :, None], axis=2 )[:, :, 0] )
+        col[allInf] = known[allInf].argmax( axis=1 )
+
+        via     = numpy.where( hasPath, col + 1, 0 )
+        changed = via != self.via
+
+        for r, c in zip( *numpy.nonzero( changed ) ):
+            self.routers[int( r )].changedRows.add( int( c ) )
+
+        self.via[:] = via
+
+        for r, router in enumerate( self.routers ):
+            router.hops = via[r].tolist()
+
+        flags = ( changed & hasPath ).any( axis=1 )
+        return { r + 1: bool( flags[r] ) for r in range( self.numRouters ) }
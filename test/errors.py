@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Error path check for the input files. Writes malformed topology and event
+files, in the text and the binary format, and checks that reading each one
+raises a ValueError naming the file, line or record and the problem, and that
+every program given an event naming a router the topology does not have exits
+with status 1 and that error rather than a traceback.
+
+Usage: python3 test/errors.py
+Exits with status 1 if any file is accepted or fails with another error.
+"""
+import os, subprocess, sys, tempfile
+
+TEST_DIR = os.path.dirname( os.path.abspath( __file__ ) )
+SRC_DIR  = os.path.join( os.path.dirname( TEST_DIR ), 'src' )
+
+sys.path.insert( 0, SRC_DIR )
+
+import generator
+from simulator import file_to_topology, file_to_topological_events, file_to_event_stream
+
+#each case is ( name, format, contents, reader, expected message ). Text
+#contents are the lines of the file, binary ones the router count and records
+#of a topology or the records of an event file. Readers take the file name.
+CASES = [
+    ( 'zero cost link', 'text', [ '3', '1 2 0', '2 3 1', '1 3 1' ], file_to_topology, ':2: link cost 0 is not positive' ),
+    ( 'zero cost link, commented', 'text', [ '3', '1 2 0 # free', '2 3 1', '1 3 1' ], file_to_topology, ':2: link cost 0 is not positive' ),
+    ( 'negative cost link', 'text', [ '3', '1 2 1', '2 3 -1', '1 3 1' ], file_to_topology, ':3: link cost -1 is not positive' ),
+    ( 'zero cost link', 'binary', ( 3, { ( 1, 2 ): 1, ( 2, 3 ): 0, ( 1, 3 ): 1 } ), file_to_topology, ': record 2: link cost 0 is not positive' ),
+    ( 'zero cost event', 'text', [ '2 1 2 5', '3 1 2 0' ], file_to_topological_events, ':2: event cost 0 is not positive, use -1 to remove the link' ),
+    ( 'zero cost event, streamed', 'text', [ '2 1 2 5', '3 1 2 0' ], lambda filename: list( file_to_event_stream( filename ) ), ':2: event cost 0 is not positive, use -1 to remove the link' ),
+    ( 'zero cost event', 'binary', [ ( 2, 1, 2, 0 ) ], file_to_topological_events, ': record 1: event cost 0 is not positive, use -1 to remove the link' ),
+    ( 'event before round 2', 'text', [ '1 1 2 5' ], file_to_topological_events, ':1: event for round 1 comes before the first round 2' ),
+    ( 'event router out of range', 'text', [ '2 1 9 5' ], lambda filename: file_to_topological_events( filename, 3 ), ':1: router 9 is not between 1 and 3' ),
+    ( 'event router out of range', 'binary', [ ( 2, 9, 1, 5 ) ], lambda filename: file_to_topological_events( filename, 3 ), ': record 1: router 9 is not between 1 and 3' )
+]
+
+#the programs given a topology and events, as the arguments before and after
+#the topology and event files
+PROGRAMS = [
+    ( 'simulator.py', [], [ '0' ] ),
+    ( 'simulator.py', [ '--stream-events' ], [ '0' ] ),
+    ( 'asynchronous.py', [], [] ),
+    ( 'partition.py', [ '--partitions', '2' ], [ '0' ] ),
+    ( 'partition.py', [ '--partitions', '2', '--stream-events' ], [ '1' ] ),
+    ( 'sweep.py', [ '--output', 'sweep', '--events' ], [] ),
+    ( 'simulator.py', [ '--resume=baseline' ], [ '1' ] ),
+    ( 'simulator.py', [ '--resume=baseline', '--stream-events' ], [ '1' ] )
+]
+
+"""
+Writes a case's file to the given directory and returns its name.
+"""
+def write_case( directory, number, file_format, contents ):
+    filename = os.path.join( directory, 'case-{}.{}'.format( number, 'txt' if file_format == 'text' else 'bin' ) )
+
+    if file_format == 'text':
+        with open( filename, 'w' ) as handle:
+            handle.write( '\n'.join( contents ) + '\n' )
+    elif isinstance( contents, tuple ):
+        generator.write_binary_topology( filename, *contents )
+    else:
+        generator.write_binary_events( filename, contents )
+
+    return filename
+
+"""
+Reads a case's file, returning a line describing how it failed to raise the
+expected error, or None if it did.
+"""
+def check_case( filename, reader, expected ):
+    try:
+        reader( filename )
+    except ValueError as error:
+        if str( error ) == filename + expected:
+            return None
+
+        return 'raised {!r}, expected {!r}'.format( str( error ), filename + expected )
+    except Exception as error:
+        return 'raised {}: {}'.format( type( error ).__name__, error )
+
+    return 'was accepted'
+
+"""
+Runs a program in the given directory on a topology and an event naming a
+router it does not have, returning a line describing how it failed to exit
+with the error, or None if it did.
+"""
+def check_program( directory, program, before, after ):
+    topology_filename = write_case( directory, 'topology', 'text', [ '3', '1 2 1', '2 3 1', '1 3 1' ] )
+    event_filename    = write_case( directory, 'events', 'text', [ '50 1 9 5' ] )
+    expected          = event_filename + ':1: router 9 is not between 1 and 3'
+
+    #a resumed simulation takes its network from the checkpoints, and checks
+    #the events against it
+    if '--resume=baseline' in before:
+        subprocess.run( [ sys.executable, os.path.join( SRC_DIR, program ), '--checkpoint=baseline', topology_filename, os.path.join( TEST_DIR, 'no_events.txt' ), '0' ], cwd=directory, check=True )
+
+        for name in os.listdir( directory ):
+            if name.startswith( 'output-' ):
+                os.remove( os.path.join( directory, name ) )
+
+        expected  = 'baseline-basic.ckpt: event for round 50: router 9 is not between 1 and 3'
+        arguments = before + [ event_filename ] + after
+    elif program == 'sweep.py':
+        arguments = before[:-1] + [ topology_filename, before[-1], event_filename ] + after
+    else:
+        arguments = before + [ topology_filename, event_filename ] + after
+
+    run = subprocess.run( [ sys.executable, os.path.join( SRC_DIR, program ) ] + arguments, cwd=directory, capture_output=True, text=True )
+
+    if run.returncode != 1 or run.stderr.strip() != expected:
+        return 'exited with status {}: {!r}, expected {!r}'.format( run.returncode, run.stderr.strip()[-200:], expected )
+
+    if any( name.startswith( 'output-' ) for name in os.listdir( directory ) ):
+        return 'left an output file behind'
+
+    return None
+
+"""
+Main function, runs on command line call.
+"""
+def main():
+    failures = []
+
+    with tempfile.TemporaryDirectory() as directory:
+        for number, ( name, file_format, contents, reader, expected ) in enumerate( CASES, 1 ):
+            problem = check_case( write_case( directory, number, file_format, contents ), reader, expected )
+
+            if problem is not None:
+                failures.append( '{} ({}): {}'.format( name, file_format, problem ) )
+
+    for program, before, after in PROGRAMS:
+        with tempfile.TemporaryDirectory() as directory:
+            problem = check_program( directory, program, before, after )
+
+            if problem is not None:
+                failures.append( '{} {}: {}'.format( program, ' '.join( before + after ), problem ) )
+
+    for failure in failures:
+        print( failure )
+
+    print( '{} cases checked, {} failed'.format( len( CASES ) + len( PROGRAMS ), len( failures ) ) )
+
+    if failures:
+        sys.exit( 1 )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Regression check for the faster ways of running a simulation. Runs the bundled
+examples and a few generated topologies, with and without events, through
+every engine, routing table class and partition count, and compares each run's
+tables, round by round, its convergence delay and any instability with a plain
+run of the loop engine over list tables. The numpy tables and the vectorized
+engine are skipped when numpy is not installed.
+
+Usage: python3 test/regression.py [--sizes 10,30] [--seeds 0,1] [--partitions 1,2,3]
+Exits with status 1 if any run differs.
+"""
+import argparse, os, sys, tempfile
+
+TEST_DIR = os.path.dirname( os.path.abspath( __file__ ) )
+
+sys.path.insert( 0, os.path.join( os.path.dirname( TEST_DIR ), 'src' ) )
+
+import generator
+from partition import PartitionedSimulation
+from router import numpy
+from simulator import VARIANTS, ENGINES, TABLES, Simulation, file_to_undirected_graph, file_to_topological_events
+
+EXAMPLES = ( 'hw3_example', 'tsquare_example', 'wikipedia_example' )
+
+#the events of each generated scenario, as ( failures, cost changes, flaps )
+EVENT_COUNTS = {
+    'no-events': ( 0, 0, 0 ),
+    'mixed'    : ( 3, 3, 2 )
+}
+
+"""
+Returns the ( engine, table ) pairs the simulator accepts, without those
+needing numpy when it is not installed.
+"""
+def combinations():
+    return [
+        ( engine, table )
+        for engine in ENGINES for table in TABLES
+        if ( engine != 'vectorized' or table == 'numpy' ) and ( numpy is not None or table != 'numpy' )
+    ]
+
+"""
+Returns what a run is compared on: its final table, the tables of every round,
+its convergence delay and its instability, if any.
+"""
+def outcome( result ):
+    rows = lambda table: [ [ tuple( entry ) for entry in row ] for row in table ]
+
+    return (
+        rows( result.table ),
+        [ ( roundNum, rows( table ) ) for roundNum, table in result.rounds ],
+        result.convergenceDelay,
+        str( result.instability ) if result.instability is not None else None
+    )
+
+"""
+Runs one variant on a scenario with the given engine and table class.
+"""
+def simulate( topology_filename, event_filename, algoType, engine, table ):
+    network = file_to_undirected_graph( topology_filename, TABLES[table] )
+    events  = file_to_topological_events( event_filename )
+
+    return outcome( Simulation( network, events, algoType, True, ENGINES[engine] ).run() )
+
+"""
+Runs one variant on a scenario split into the given number of partitions.
+"""
+def simulate_partitioned( topology_filename, event_filename, algoType, partitions, table ):
+    events = file_to_topological_events( event_filename )
+
+    return outcome( PartitionedSimulation( topology_filename, events, algoType, partitions, TABLES[table], True ).run() )
+
+"""
+Describes the first way two outcomes differ.
+"""
+def first_difference( expected, actual ):
+    table, rounds, delay, instability = expected
+
+    if instability != actual[3]:
+        return 'instability {} instead of {}'.format( actual[3], instability )
+
+    if delay != actual[2]:
+        return 'convergence delay {} instead of {}'.format( actual[2], delay )
+
+    for ( roundNum, expected_table ), ( actualRound, actual_table ) in zip( rounds, actual[1] ):
+        if roundNum != actualRound or expected_table != actual_table:
+            return 'round {} differs'.format( roundNum )
+
+    if len( rounds ) != len( actual[1] ):
+        return '{} rounds instead of {}'.format( len( actual[1] ), len( rounds ) )
+
+    return 'final table differs'
+
+"""
+Checks every way of running every variant on a scenario against the loop
+engine over list tables. Returns a line per run that differs.
+"""
+def check_scenario( name, topology_filename, event_filename, partitions ):
+    failures = []
+
+    for variant, algoType in VARIANTS.items():
+        expected = simulate( topology_filename, event_filename, algoType, 'loop', 'list' )
+        runs     = [
+            ( 'engine {}, {} tables'.format( engine, table ), lambda engine=engine, table=table: simulate( topology_filename, event_filename, algoType, engine, table ) )
+            for engine, table in combinations() if ( engine, table ) != ( 'loop', 'list' )
+        ]
+
+        runs += [
+            ( '{} partitions, {} tables'.format( count, table ), lambda count=count, table=table: simulate_partitioned( topology_filename, event_filename, algoType, count, table ) )
+            for count in partitions for table in TABLES if numpy is not None or table != 'numpy'
+        ]
+
+        for label, run in runs:
+            actual = run()
+
+            if actual != expected:
+                failures.append( '{}, {}, {}: {}'.format( name, variant, label, first_difference( expected, actual ) ) )
+
+    return failures
+
+"""
+Returns the ( name, topology file, event file ) of every scenario, writing the
+generated ones to the given directory.
+"""
+def scenarios( directory, sizes, seeds ):
+    for example in EXAMPLES:
+        yield example, os.path.join( TEST_DIR, example, 'topography.txt' ), os.path.join( TEST_DIR, example, 'events.txt' )
+
+    for kind in generator.TOPOLOGIES:
+        for size in sizes:
+            for seed in seeds:
+                num_routers, edges = generator.generate_topology( kind, size, seed )
+                topology_filename  = os.path.join( directory, '{}-{}-{}-topology.txt'.format( kind, size, seed ) )
+
+                generator.write_topology( topology_filename, num_routers, edges )
+
+                for events_name, ( failures, cost_changes, flaps ) in EVENT_COUNTS.items():
+                    event_filename = os.path.join( directory, '{}-{}-{}-{}.txt'.format( kind, size, seed, events_name ) )
+
+                    generator.write_events( event_filename, generator.generate_events( edges, failures, cost_changes, flaps, seed=seed ) )
+
+                    yield '{} {} seed {} {}'.format( kind, size, seed, events_name ), topology_filename, event_filename
+
+"""
+Main function, runs on command line call.
+"""
+def main( argv=None ):
+    parser = argparse.ArgumentParser( description='Compare every engine, table class and partition count with the plain simulation.' )
+    parser.add_argument( '--sizes', default='10,30', help='comma separated router counts of the generated topologies' )
+    parser.add_argument( '--seeds', default='0,1', help='comma separated seeds of the generated topologies' )
+    parser.add_argument( '--partitions', default='1,2,3', help='comma separated partition counts' )
+
+    args       = parser.parse_args( argv )
+    sizes      = [ int( size ) for size in args.sizes.split( ',' ) ]
+    seeds      = [ int( seed ) for seed in args.seeds.split( ',' ) ]
+    partitions = [ int( count ) for count in args.partitions.split( ',' ) ]
+    failures   = []
+    checked    = 0
+
+    if numpy is None:
+        print( 'numpy is not installed, skipping numpy tables and the vectorized engine' )
+
+    with tempfile.TemporaryDirectory() as directory:
+        for name, topology_filename, event_filename in scenarios( directory, sizes, seeds ):
+            failures += check_scenario( name, topology_filename, event_filename, partitions )
+            checked  += 1
+
+    for failure in failures:
+        print( failure )
+
+    print( '{} scenarios checked, {} runs differ'.format( checked, len( failures ) ) )
+
+    if failures:
+        sys.exit( 1 )
+
+if __name__ == "__main__":
+    main()